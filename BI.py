@@ -1,23 +1,92 @@
+import io
+import time
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
-import joblib
-from sklearn.preprocessing import OrdinalEncoder
-import os
-import numpy as np
+from data_store import OrderStore
+from cube import build_cube, rollup
+from kpi import compute_kpis
+from date_index import month_labels, month_range, year_labels, year_range
+from charts import decimate
+from figure_cache import FigureCache
+from scoring import PREDICTION_COL, PROBA_COL, THRESHOLD, predict_proba
+from schema import SchemaError, UploadSchema
+from ingest import file_format
+from export import EXPORT_FORMATS, export_bytes
+from jobs import CANCELLED, FAILED, JobQueue
+from results_view import PAGE_SIZES, TOP_RISK, filter_rows, histogram, page_of, summary, top_risk
+from model_store import ModelStore
 
 
 # =========================
 # 1. Chargement des données (VERSION CORRIGÉE)
 # =========================
-@st.cache_data(ttl=60)  # Cache expire après 60 secondes
-def load_data():
-    df = pd.read_excel("data.xlsx")
-    if "Date_Creation" in df.columns:
-        df["Date_Creation"] = pd.to_datetime(df["Date_Creation"])
-    return df
+@st.cache_resource  # Une seule instance par processus, partagée entre les sessions
+def get_order_store():
+    # Store Parquet (python data_store.py) si présent, sinon data.xlsx
+    return OrderStore("data.xlsx", "data_store")
 
-df = load_data()
+def load_data():
+    # Rechargement complet seulement si la source a changé (empreinte mtime/taille/hash).
+    # Le DataFrame est partagé : ne jamais le modifier en place.
+    return get_order_store().snapshot()
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_cube(_df, data_version):
+    # Cube d'agrégats reconstruit une seule fois par version des données ; partagé
+    # tel quel entre les reruns et les sessions (pas de copie) : lecture seule
+    return build_cube(_df)
+
+@st.cache_resource  # Modèle + pipeline de features chargés une fois par processus, partagés entre les sessions
+def get_model_store():
+    # Rechargés seulement si les fichiers changent ; tableaux NumPy mappés en mémoire
+    return ModelStore(mmap_mode="r")
+
+@st.cache_resource  # File de travaux partagée par toutes les sessions du processus
+def get_job_queue():
+    return JobQueue()
+
+job_queue = get_job_queue()
+upload_schema = UploadSchema()  # Colonnes attendues des fichiers à scorer (schema.py)
+
+PREDICTION_CHUNK = 20_000  # Commandes scorées entre deux points de progression / annulation
+JOB_REFRESH_SECONDS = 0.5  # Rafraîchissement de la page pendant un travail
+
+def run_prediction(job, model_store, df_uploaded, mapping, format_export):
+    # Exécuté par la file de travaux (jobs.py) : prédiction par blocs, progression et annulation entre deux blocs
+    version = model_store.version
+    model, pipeline = model_store.get()
+    recharge = model_store.version != version
+    n = len(df_uploaded)
+    # Vélocité : fichier scoré d'un seul bloc (fenêtres à cheval sur plusieurs blocs sinon)
+    taille = max(n, 1) if pipeline.velocity else PREDICTION_CHUNK
+    start = time.perf_counter()
+    y_proba = np.empty(n)
+    for debut in range(0, n, taille):
+        job.report(0.9 * debut / n, f"{debut} / {n} commandes scorées")
+        # -------- Prétraitement identique à l'entraînement + prédiction (scoring.py) --------
+        y_proba[debut:debut + taille] = predict_proba(df_uploaded.iloc[debut:debut + taille], model, pipeline)
+
+    # Colonnes résultat ajoutées sous les en-têtes d'origine du fichier
+    resultats = df_uploaded.rename(columns={v: k for k, v in mapping.items()})
+    resultats[PROBA_COL] = y_proba
+    resultats[PREDICTION_COL] = (y_proba >= THRESHOLD).astype(int)
+    duree = time.perf_counter() - start
+
+    job.report(0.9, f"Export {format_export}")
+    start = time.perf_counter()
+    exports = {format_export: (export_bytes(resultats, format_export), time.perf_counter() - start)}
+    return {"resultats": resultats, "exports": exports, "duree": duree, "recharge": recharge,
+            "chargement": model_store.last_load_seconds}
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def read_upload(data, name):
+    # Le fichier importé est relu à chaque interaction : parsé une seule fois par contenu
+    return upload_schema.read(io.BytesIO(data), file_format(name))
+
+df, data_version = load_data()
+cube = get_cube(df, data_version)
 
 
 
@@ -101,22 +170,71 @@ with st.sidebar:
 # =========================
 # 5. Fonctions utilitaires réutilisables
 # =========================
-def chart_card(df, col_name, title=""):
-    with st.container():
-        fig = px.pie(
-            df,
-            names=col_name,
-            title="",
-            hole=0.4
-        )
-        fig.update_layout(
-            height=450,
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(0,0,0,0)',
-            font=dict(size=12),
-            legend_title=prettify(col_name)
-        )
+# Taille du JSON de chaque figure envoyée au navigateur pendant ce rerun
+st.session_state.payloads = {}
+
+@st.cache_resource  # Cache LRU de figures partagé par toutes les sessions du processus
+def get_figure_cache():
+    return FigureCache(max_entries=256)
+
+figure_cache = get_figure_cache()
+figure_cache.invalidate(data_version)
+
+def cached_figure(chart, state, build):
+    # Clé : (page, graphique, état des filtres, version des données)
+    key = (st.session_state.page, chart, state, data_version)
+    return figure_cache.get_or_build(key, build)
+
+def render_chart(fig, size, name):
+    st.session_state.payloads[name] = size
+    st.plotly_chart(fig, use_container_width=True)
+
+def show_chart(chart, state, build):
+    # Affiche la figure (construite ou lue dans le cache) ; False si rien à tracer
+    fig, size = cached_figure(chart, state, build)
+    if fig is None:
+        return False
+    render_chart(fig, size, fig.layout.title.text or chart)
+    return True
+
+def pie_figure(counts, col_name):
+    # counts : Series (modalité -> nombre de commandes) issue d'un roll-up du cube,
+    # limitée aux principales modalités + "Autres" (taille de figure constante)
+    if counts.empty:
+        return None
+    counts = decimate(counts, col_name)
+    fig = px.pie(
+        names=counts.index.astype(str),
+        values=counts.values,
+        title="",
+        hole=0.4
+    )
+    fig.update_layout(
+        height=450,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        font=dict(size=12),
+        legend_title=prettify(col_name)
+    )
+    return fig
 
+def bar_figure(period, color, y_label, title, where=None, start=None, end=None, **px_kwargs):
+    # Barres par jour (mode mensuel) ou par mois (mode annuel) depuis le cube
+    x_col, x_label = ("Num_Jour", "Jour") if period == "jour" else ("Num_Mois", "Mois")
+    counts = rollup(cube, [x_col, color], where=where, start=start, end=end)
+    if counts.empty:
+        return None
+    data = counts.reset_index(name=y_label).rename(columns={x_col: x_label})
+    fig = px.bar(data, x=x_label, y=y_label, color=color, title=title, **px_kwargs)
+    fig.update_layout(height=450)
+    return fig
+
+def chart_card(col_name, title, state, counts_fn):
+    # Camembert dans une carte ; counts_fn n'est appelé qu'en cas de miss du cache
+    fig, size = cached_figure(title or col_name, state, lambda: pie_figure(counts_fn(), col_name))
+    if fig is None:
+        return
+    with st.container():
         st.markdown(
             f"""
             <div style="
@@ -132,20 +250,30 @@ def chart_card(df, col_name, title=""):
             unsafe_allow_html=True
         )
 
-        st.plotly_chart(fig, use_container_width=True)
+        render_chart(fig, size, title or col_name)
         st.markdown("</div>", unsafe_allow_html=True)
 
+ETAT_COMMANDE_STYLE = dict(
+    category_orders={"Etat_Commande": ["Confirmée", "En confirmation", "Annulée"]},
+    color_discrete_map={
+        "Confirmée": "#4DA6FF",
+        "En confirmation": "#FFD966",
+        "Annulée": "#FF4C4C"
+    }
+)
+
 # =========================
 # 6. Contenu de la page Confirmation (page par défaut)
 # =========================
 if st.session_state.page == 'confirmation':
     st.title("Dashboard Confirmation")
     
-    # KPIs globaux
-    total_cmds = len(df)
-    confirmed = len(df[df["Etat_Commande"] == "Confirmée"])
-    cancelled = len(df[df["Etat_Commande"] == "Annulée"])
-    pending = len(df[df["Etat_Commande"] == "En confirmation"])
+    # KPIs globaux (une passe sur le cube, cf. kpi.py)
+    kpis = compute_kpis(cube)
+    total_cmds = kpis["total"]
+    confirmed = kpis["confirmees"]
+    cancelled = kpis["annulees"]
+    pending = kpis["en_confirmation"]
     
     st.markdown(
         """
@@ -185,9 +313,7 @@ if st.session_state.page == 'confirmation':
         """,
         unsafe_allow_html=True
     )
-    confirmed = len(df[df["Etat_Commande"] == "Confirmée"])
-    cancelled = len(df[df["Etat_Commande"] == "Annulée"])
-    taux_confirmation = confirmed / (confirmed + cancelled) 
+    taux_confirmation = kpis["taux_confirmation"]
 
     col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric(" Total commandes", total_cmds)
@@ -201,23 +327,17 @@ if st.session_state.page == 'confirmation':
     # =========================
 
     # Définir le filtre global pour les pie charts
-    if "Date_Creation" in df.columns:
-        min_date = df["Date_Creation"].min()
-        max_date = df["Date_Creation"].max()
+    pie_start, pie_end = None, None
+    if "Jour" in cube.columns:
+        min_date = cube["Jour"].min()
+        max_date = cube["Jour"].max()
         pie_date_range = st.date_input(
             "Choisir la période :",
             [min_date, max_date],
             key="pie_filter"
         )
         if len(pie_date_range) == 2:
-            df_pie = df[
-                (df["Date_Creation"] >= pd.to_datetime(pie_date_range[0])) &
-                (df["Date_Creation"] <= pd.to_datetime(pie_date_range[1]))
-            ]
-        else:
-            df_pie = df.copy()
-    else:
-        df_pie = df.copy()
+            pie_start, pie_end = pie_date_range
 
     # =========================
     # 8. Organisation des cartes (2x2)
@@ -226,156 +346,101 @@ if st.session_state.page == 'confirmation':
     row2_col1, row2_col2 = st.columns(2)
 
     with row1_col1:
-        chart_card(df, "Etat_Commande", "État des commandes")
+        chart_card("Etat_Commande", "État des commandes", (), lambda: rollup(cube, "Etat_Commande"))
     with row1_col2:
-        chart_card(df, "Boutique", "Commandes par boutique")
+        chart_card("Boutique", "Commandes par boutique", (), lambda: rollup(cube, "Boutique"))
 
     col1, col2 = st.columns(2)
 
     with col1:
         # Répartition des commandes par Source
-        if "Source" in df_pie.columns:
-            chart_card(df_pie, "Source", title="Répartition des commandes par Source")
+        if "Source" in cube.columns:
+            chart_card(
+                "Source", "Répartition des commandes par Source", (pie_start, pie_end),
+                lambda: rollup(cube, "Source", start=pie_start, end=pie_end)
+            )
 
     with col2:
-        # Répartition des commandes Confirmées par Shift
-        if "Shift" in df_pie.columns and "Etat_Commande" in df_pie.columns:
-            df_conf_shift = df_pie[df_pie["Etat_Commande"] == "Confirmée"].copy()
-            if not df_conf_shift.empty:
-                chart_card(df_conf_shift, "Shift", title="Confirmées : Matin vs Soir")
+        # Répartition des commandes Confirmées par Shift (rien si aucune commande)
+        if "Shift" in cube.columns and "Etat_Commande" in cube.columns:
+            chart_card(
+                "Shift", "Confirmées : Matin vs Soir", (pie_start, pie_end),
+                lambda: rollup(cube, "Shift", where={"Etat_Commande": "Confirmée"}, start=pie_start, end=pie_end)
+            )
 
     # =========================
     # 9. Graphiques d'évolution (avec filtre global)
     # =========================
 
-    if "Date_Creation" in df.columns:
-        df["Annee"] = df["Date_Creation"].dt.year
-        df["Mois"] = df["Date_Creation"].dt.to_period("M").astype(str)
-
+    if "Jour" in cube.columns:
         st.subheader("Évolution des commandes")
 
         mode = st.radio("Type d'analyse :", ["Mensuelle", "Annuelle"], horizontal=True)
 
         # ===== Mode Mensuel =====
         if mode == "Mensuelle":
-            mois_dispo = sorted(df["Mois"].unique())
+            mois_dispo = month_labels(cube["Jour"])
             mois_select = st.selectbox("Choisir un mois :", mois_dispo, key="mois_global")
-
-            df_mois = df[df["Mois"] == mois_select]
+            debut, fin = month_range(mois_select)
 
             # Créer deux colonnes pour les graphiques
             evo_col1, evo_col2 = st.columns(2)
 
             # Graphique d'évolution des commandes (gauche)
             with evo_col1:
-                df_grouped = df_mois.groupby(
-                    [df_mois["Date_Creation"].dt.day, "Etat_Commande"]
-                ).size().reset_index(name="Nombre De Commandes")
-                df_grouped.rename(columns={"Date_Creation": "Jour"}, inplace=True)
-
-                fig_total = px.bar(
-                    df_grouped,
-                    x="Jour",
-                    y="Nombre De Commandes",
-                    color="Etat_Commande",
-                    title=f"Évolution des commandes - {mois_select}",
-                    barmode="stack",
-                    category_orders={"Etat_Commande": ["Confirmée", "En confirmation", "Annulée"]},
-                    color_discrete_map={
-                        "Confirmée": "#4DA6FF",
-                        "En confirmation": "#FFD966",
-                        "Annulée": "#FF4C4C"
-                    }
-                )
-                fig_total.update_layout(height=450)
-                st.plotly_chart(fig_total, use_container_width=True)
+                show_chart("evolution_commandes", ("mois", mois_select), lambda: bar_figure(
+                    "jour", "Etat_Commande", "Nombre De Commandes",
+                    f"Évolution des commandes - {mois_select}",
+                    start=debut, end=fin, barmode="stack", **ETAT_COMMANDE_STYLE
+                ))
 
             # Graphique des fausses commandes par source (droite)
             with evo_col2:
                 # Vérifier si la colonne existe avant de filtrer
-                if "Fausse_Commande" in df_mois.columns:
-                    # Filtrer seulement les fausses commandes
-                    df_fausses = df_mois[df_mois["Fausse_Commande"] == 1].copy()
-                    
-                    if not df_fausses.empty and "Source" in df_fausses.columns:
-                        df_fausses_grouped = df_fausses.groupby(
-                            [df_fausses["Date_Creation"].dt.day, "Source"]
-                        ).size().reset_index(name="Nombre De Fausses Commandes")
-                        df_fausses_grouped.rename(columns={"Date_Creation": "Jour"}, inplace=True)
-
-                        fig_fausses = px.bar(
-                            df_fausses_grouped,
-                            x="Jour",
-                            y="Nombre De Fausses Commandes",
-                            color="Source",
-                            title=f"Fausses commandes par Source - {mois_select}",
-                            barmode="stack"
+                if "Fausse_Commande" in cube.columns:
+                    # Seulement les fausses commandes
+                    affiche = "Source" in cube.columns and show_chart(
+                        "fausses_par_source", ("mois", mois_select), lambda: bar_figure(
+                            "jour", "Source", "Nombre De Fausses Commandes",
+                            f"Fausses commandes par Source - {mois_select}",
+                            where={"Fausse_Commande": 1}, start=debut, end=fin, barmode="stack"
                         )
-                        fig_fausses.update_layout(height=450)
-                        st.plotly_chart(fig_fausses, use_container_width=True)
-                    else:
+                    )
+                    if not affiche:
                         st.info("Aucune fausse commande trouvée pour cette période")
                 else:
                     st.info("Colonne 'Fausse_Commande' non disponible")
 
         # ===== Mode Annuel =====
         else:
-            annees_dispo = sorted(df["Annee"].unique())
+            annees_dispo = year_labels(cube["Annee"])
             annee_select = st.selectbox("Choisir une année :", annees_dispo, key="annee_global")
-
-            df_annee = df[df["Annee"] == annee_select]
+            debut, fin = year_range(annee_select)
 
             # Créer deux colonnes pour les graphiques
             evo_col1, evo_col2 = st.columns(2)
 
             # Graphique d'évolution des commandes (gauche)
             with evo_col1:
-                df_grouped = df_annee.groupby(
-                    [df_annee["Date_Creation"].dt.month, "Etat_Commande"]
-                ).size().reset_index(name="Nombre De Commandes")
-                df_grouped.rename(columns={"Date_Creation": "Mois"}, inplace=True)
-
-                fig_total = px.bar(
-                    df_grouped,
-                    x="Mois",
-                    y="Nombre De Commandes",
-                    color="Etat_Commande",
-                    title=f"Évolution des commandes - {annee_select}",
-                    barmode="stack",
-                    category_orders={"Etat_Commande": ["Confirmée", "En confirmation", "Annulée"]},
-                    color_discrete_map={
-                        "Confirmée": "#4DA6FF",
-                        "En confirmation": "#FFD966",
-                        "Annulée": "#FF4C4C"
-                    }
-                )
-                fig_total.update_layout(height=450)
-                st.plotly_chart(fig_total, use_container_width=True)
+                show_chart("evolution_commandes", ("annee", annee_select), lambda: bar_figure(
+                    "mois", "Etat_Commande", "Nombre De Commandes",
+                    f"Évolution des commandes - {annee_select}",
+                    start=debut, end=fin, barmode="stack", **ETAT_COMMANDE_STYLE
+                ))
 
             # Graphique des fausses commandes par source (droite)
             with evo_col2:
                 # Vérifier si la colonne existe avant de filtrer
-                if "Fausse_Commande" in df_annee.columns:
-                    # Filtrer seulement les fausses commandes
-                    df_fausses = df_annee[df_annee["Fausse_Commande"] == 1].copy()
-                    
-                    if not df_fausses.empty and "Source" in df_fausses.columns:
-                        df_fausses_grouped = df_fausses.groupby(
-                            [df_fausses["Date_Creation"].dt.month, "Source"]
-                        ).size().reset_index(name="Nombre De Fausses Commandes")
-                        df_fausses_grouped.rename(columns={"Date_Creation": "Mois"}, inplace=True)
-
-                        fig_fausses = px.bar(
-                            df_fausses_grouped,
-                            x="Mois",
-                            y="Nombre De Fausses Commandes",
-                            color="Source",
-                            title=f"Fausses commandes par Source - {annee_select}",
-                            barmode="stack"
+                if "Fausse_Commande" in cube.columns:
+                    # Seulement les fausses commandes
+                    affiche = "Source" in cube.columns and show_chart(
+                        "fausses_par_source", ("annee", annee_select), lambda: bar_figure(
+                            "mois", "Source", "Nombre De Fausses Commandes",
+                            f"Fausses commandes par Source - {annee_select}",
+                            where={"Fausse_Commande": 1}, start=debut, end=fin, barmode="stack"
                         )
-                        fig_fausses.update_layout(height=450)
-                        st.plotly_chart(fig_fausses, use_container_width=True)
-                    else:
+                    )
+                    if not affiche:
                         st.info("Aucune fausse commande trouvée pour cette période")
                 else:
                     st.info("Colonne 'Fausse_Commande' non disponible")
@@ -387,14 +452,15 @@ elif st.session_state.page == 'livraison':
     st.title("Dashboard Livraison et Stock")
     
     # KPIs pour la livraison
-    livree = len(df[df["Etat_Livraison"] == "Livrée"])
-    expediee = len(df[df["Etat_Stock"] == "Expédiée"])
-    retour = len(df[df["Etat_Livraison"] == "Retour"])
-    en_livraison = len(df[df["Etat_Livraison"] == "En livraison"])
-    preparation_stock = len(df[df["Etat_Livraison"] == "Preparation Stock"])
+    kpis = compute_kpis(cube)
+    livree = kpis["livrees"]
+    expediee = kpis["expediees"]
+    retour = kpis["retours"]
+    en_livraison = kpis["en_livraison"]
+    preparation_stock = kpis["preparation_stock"]
     
     # Calcul du taux de livraison
-    taux_livraison = livree / (livree + retour) if (livree + retour) > 0 else 0
+    taux_livraison = kpis["taux_livraison"]
 
     st.markdown(
         """
@@ -445,23 +511,17 @@ elif st.session_state.page == 'livraison':
     # =========================
     # Filtre date global pour les pie charts
     # =========================
-    if "Date_Creation" in df.columns:
-        min_date = df["Date_Creation"].min()
-        max_date = df["Date_Creation"].max()
+    pie_start, pie_end = None, None
+    if "Jour" in cube.columns:
+        min_date = cube["Jour"].min()
+        max_date = cube["Jour"].max()
         pie_date_range = st.date_input(
             "Choisir la période :",
             [min_date, max_date],
             key="pie_livraison"
         )
         if len(pie_date_range) == 2:
-            df_pie = df[
-                (df["Date_Creation"] >= pd.to_datetime(pie_date_range[0])) &
-                (df["Date_Creation"] <= pd.to_datetime(pie_date_range[1]))
-            ]
-        else:
-            df_pie = df.copy()
-    else:
-        df_pie = df.copy()
+            pie_start, pie_end = pie_date_range
 
     # =========================
     # Matrice 2x2 - Graphiques camembert
@@ -470,128 +530,82 @@ elif st.session_state.page == 'livraison':
     
     with row1_col1:
     # Pie chart État des commandes stock
-        if "Etat_Livraison" in df_pie.columns:
-        # Filtrer les lignes où Etat_Livraison n'est pas vide
-             df_filtered = df_pie[df_pie["Etat_Livraison"].notna() & (df_pie["Etat_Livraison"] != "")]
-             chart_card(df_filtered, "Etat_Livraison", "État des commandes stock")
+        if "Etat_Livraison" in cube.columns:
+        # Exclure les lignes où Etat_Livraison est vide (NaN exclus par le roll-up)
+             def etats_filtres():
+                 etats = rollup(cube, "Etat_Livraison", start=pie_start, end=pie_end)
+                 return etats[etats.index != ""]
+             chart_card("Etat_Livraison", "État des commandes stock", (pie_start, pie_end), etats_filtres)
     
     with row1_col2:
         # Pie chart Sociétés de livraison (commandes livrées)
-        if "Societe_Livraison" in df_pie.columns and "Etat_Livraison" in df_pie.columns:
-            commandes_livrees = df_pie[df_pie["Etat_Livraison"] == "Livrée"]
-            if not commandes_livrees.empty:
-                chart_card(commandes_livrees, "Societe_Livraison", "Livraisons par société")
+        if "Societe_Livraison" in cube.columns and "Etat_Livraison" in cube.columns:
+            chart_card(
+                "Societe_Livraison", "Livraisons par société", (pie_start, pie_end),
+                lambda: rollup(cube, "Societe_Livraison", where={"Etat_Livraison": "Livrée"}, start=pie_start, end=pie_end)
+            )
 
     # =========================
     # Graphiques d'évolution
     # =========================
-    if "Date_Creation" in df.columns:
-        df["Annee"] = df["Date_Creation"].dt.year
-        df["Mois"] = df["Date_Creation"].dt.to_period("M").astype(str)
-
+    if "Jour" in cube.columns:
         st.subheader("Évolution des livraisons")
 
         mode = st.radio("Type d'analyse :", ["Mensuelle", "Annuelle"], horizontal=True, key="mode_livraison")
 
         # ===== Mode Mensuel =====
         if mode == "Mensuelle":
-            mois_dispo = sorted(df["Mois"].unique())
+            mois_dispo = month_labels(cube["Jour"])
             mois_select = st.selectbox("Choisir un mois :", mois_dispo, key="mois_livraison")
-
-            df_mois = df[df["Mois"] == mois_select]
+            debut, fin = month_range(mois_select)
 
             # Créer deux colonnes pour les graphiques
             evo_col1, evo_col2 = st.columns(2)
 
             # Graphique empilé des états de livraison (gauche)
             with evo_col1:
-                if "Etat_Livraison" in df_mois.columns:
-                    df_grouped = df_mois.groupby(
-                        [df_mois["Date_Creation"].dt.day, "Etat_Livraison"]
-                    ).size().reset_index(name="Nombre De Commandes")
-                    df_grouped.rename(columns={"Date_Creation": "Jour"}, inplace=True)
-
-                    fig_empile = px.bar(
-                        df_grouped,
-                        x="Jour",
-                        y="Nombre De Commandes",
-                        color="Etat_Livraison",
-                        title=f"Évolution des livraisons - {mois_select}",
-                        barmode="stack"
-                    )
-                    fig_empile.update_layout(height=450)
-                    st.plotly_chart(fig_empile, use_container_width=True)
+                if "Etat_Livraison" in cube.columns:
+                    show_chart("evolution_livraisons", ("mois", mois_select), lambda: bar_figure(
+                        "jour", "Etat_Livraison", "Nombre De Commandes",
+                        f"Évolution des livraisons - {mois_select}",
+                        start=debut, end=fin, barmode="stack"
+                    ))
 
             # Graphique des retours par société (droite)
             with evo_col2:
-                if "Societe_Livraison" in df_mois.columns and "Etat_Livraison" in df_mois.columns:
-                    retours_data = df_mois[df_mois["Etat_Livraison"] == "Retour"]
-                    if not retours_data.empty:
-                        df_retours_grouped = retours_data.groupby(
-                            [retours_data["Date_Creation"].dt.day, "Societe_Livraison"]
-                        ).size().reset_index(name="Nombre De Retours")
-                        df_retours_grouped.rename(columns={"Date_Creation": "Jour"}, inplace=True)
-
-                        fig_retours = px.bar(
-                            df_retours_grouped,
-                            x="Jour",
-                            y="Nombre De Retours",
-                            color="Societe_Livraison",
-                            title=f"Retours par société - {mois_select}",
-                            barmode="stack"
-                        )
-                        fig_retours.update_layout(height=450)
-                        st.plotly_chart(fig_retours, use_container_width=True)
+                if "Societe_Livraison" in cube.columns and "Etat_Livraison" in cube.columns:
+                    show_chart("retours_par_societe", ("mois", mois_select), lambda: bar_figure(
+                        "jour", "Societe_Livraison", "Nombre De Retours",
+                        f"Retours par société - {mois_select}",
+                        where={"Etat_Livraison": "Retour"}, start=debut, end=fin, barmode="stack"
+                    ))
 
         # ===== Mode Annuel =====
         else:
-            annees_dispo = sorted(df["Annee"].unique())
+            annees_dispo = year_labels(cube["Annee"])
             annee_select = st.selectbox("Choisir une année :", annees_dispo, key="annee_livraison")
-
-            df_annee = df[df["Annee"] == annee_select]
+            debut, fin = year_range(annee_select)
 
             # Créer deux colonnes pour les graphiques
             evo_col1, evo_col2 = st.columns(2)
 
             # Graphique empilé des états de livraison (gauche)
             with evo_col1:
-                if "Etat_Livraison" in df_annee.columns:
-                    df_grouped = df_annee.groupby(
-                        [df_annee["Date_Creation"].dt.month, "Etat_Livraison"]
-                    ).size().reset_index(name="Nombre De Commandes")
-                    df_grouped.rename(columns={"Date_Creation": "Mois"}, inplace=True)
-
-                    fig_empile = px.bar(
-                        df_grouped,
-                        x="Mois",
-                        y="Nombre De Commandes",
-                        color="Etat_Livraison",
-                        title=f"Évolution des livraisons - {annee_select}",
-                        barmode="stack"
-                    )
-                    fig_empile.update_layout(height=450)
-                    st.plotly_chart(fig_empile, use_container_width=True)
+                if "Etat_Livraison" in cube.columns:
+                    show_chart("evolution_livraisons", ("annee", annee_select), lambda: bar_figure(
+                        "mois", "Etat_Livraison", "Nombre De Commandes",
+                        f"Évolution des livraisons - {annee_select}",
+                        start=debut, end=fin, barmode="stack"
+                    ))
 
             # Graphique des retours par société (droite)
             with evo_col2:
-                if "Societe_Livraison" in df_annee.columns and "Etat_Livraison" in df_annee.columns:
-                    retours_data = df_annee[df_annee["Etat_Livraison"] == "Retour"]
-                    if not retours_data.empty:
-                        df_retours_grouped = retours_data.groupby(
-                            [retours_data["Date_Creation"].dt.month, "Societe_Livraison"]
-                        ).size().reset_index(name="Nombre De Retours")
-                        df_retours_grouped.rename(columns={"Date_Creation": "Mois"}, inplace=True)
-
-                        fig_retours = px.bar(
-                            df_retours_grouped,
-                            x="Mois",
-                            y="Nombre De Retours",
-                            color="Societe_Livraison",
-                            title=f"Retours par société - {annee_select}",
-                            barmode="group"
-                        )
-                        fig_retours.update_layout(height=450)
-                        st.plotly_chart(fig_retours, use_container_width=True)
+                if "Societe_Livraison" in cube.columns and "Etat_Livraison" in cube.columns:
+                    show_chart("retours_par_societe", ("annee", annee_select), lambda: bar_figure(
+                        "mois", "Societe_Livraison", "Nombre De Retours",
+                        f"Retours par société - {annee_select}",
+                        where={"Etat_Livraison": "Retour"}, start=debut, end=fin, barmode="group"
+                    ))
 
     # =========================
     # Carte de l'Algérie pour les retours
@@ -599,26 +613,20 @@ elif st.session_state.page == 'livraison':
     st.subheader("Carte des retours par wilaya")
     
     # Filtre spécifique pour la carte
-    if "Date_Creation" in df.columns:
-        min_date_map = df["Date_Creation"].min()
-        max_date_map = df["Date_Creation"].max()
+    map_start, map_end = None, None
+    if "Jour" in cube.columns:
+        min_date_map = cube["Jour"].min()
+        max_date_map = cube["Jour"].max()
         map_date_range = st.date_input(
             "Choisir la période pour la carte :",
             [min_date_map, max_date_map],
             key="map_livraison"
         )
         if len(map_date_range) == 2:
-            df_map = df[
-                (df["Date_Creation"] >= pd.to_datetime(map_date_range[0])) &
-                (df["Date_Creation"] <= pd.to_datetime(map_date_range[1]))
-            ]
-        else:
-            df_map = df.copy()
-    else:
-        df_map = df.copy()
+            map_start, map_end = map_date_range
 
     # Fonction pour créer la carte des retours
-    def create_algeria_map_retours(df_map):
+    def create_algeria_map_retours(wilaya_retours):
         wilaya_coordinates = {
             'Alger': [36.7525, 3.0420], 'Oran': [35.6971, -0.6337], 'Constantine': [36.3650, 6.6147],
             'Annaba': [36.9000, 7.7667], 'Blida': [36.4722, 2.8333], 'Batna': [35.5550, 6.1741],
@@ -629,18 +637,14 @@ elif st.session_state.page == 'livraison':
             'Ghardaïa': [32.4833, 3.6667], 'Adrar': [27.8742, -0.2939]
         }
         
-        if 'Wilaya' in df_map.columns and 'Etat_Livraison' in df_map.columns:
-            retours_map = df_map[df_map["Etat_Livraison"] == "Retour"]
-            wilaya_retours = retours_map['Wilaya'].value_counts().reset_index()
-            wilaya_retours.columns = ['Wilaya', 'Nombre_Retours']
-            
+        if wilaya_retours is not None:
             map_data = []
-            for wilaya, count in wilaya_retours.values:
+            for wilaya, nombre in wilaya_retours.items():
                 if wilaya in wilaya_coordinates:
                     lat, lon = wilaya_coordinates[wilaya]
                     map_data.append({
                         'Wilaya': wilaya,
-                        'Nombre_Retours': count,
+                        'Nombre_Retours': nombre,
                         'Latitude': lat,
                         'Longitude': lon
                     })
@@ -668,10 +672,15 @@ elif st.session_state.page == 'livraison':
                 return fig
         return None
 
-    algeria_map_retours = create_algeria_map_retours(df_map)
-    if algeria_map_retours:
-        st.plotly_chart(algeria_map_retours, use_container_width=True)
-    else:
+    def build_map():
+        wilaya_retours = None
+        if 'Wilaya' in cube.columns and 'Etat_Livraison' in cube.columns:
+            wilaya_retours = rollup(
+                cube, "Wilaya", where={"Etat_Livraison": "Retour"}, start=map_start, end=map_end
+            )
+        return create_algeria_map_retours(wilaya_retours)
+
+    if not show_chart("carte_retours", (map_start, map_end), build_map):
         st.info("Pour afficher la carte des retours, assurez-vous d'avoir les colonnes 'Wilaya' et 'Etat_Livraison' dans vos données.")
 
 
@@ -682,106 +691,141 @@ elif st.session_state.page == 'livraison':
 
 elif st.session_state.page == 'prediction':
     st.title("Prédiction de fausses commandes")
-    st.write("Importez un fichier Excel contenant les colonnes nécessaires pour obtenir une prédiction.")
+    st.write("Importez un fichier Excel (ou CSV / Parquet, plus rapides à lire) contenant les colonnes nécessaires pour obtenir une prédiction.")
 
-    uploaded_file = st.file_uploader("📂 Joindre un fichier Excel", type=["xlsx"])
+    uploaded_file = st.file_uploader("📂 Joindre un fichier de commandes", type=["xlsx", "csv", "parquet"])
 
     if uploaded_file is not None:
-        df_uploaded = pd.read_excel(uploaded_file)
-
-        # Colonnes attendues (dans le fichier utilisateur)
-        colonnes_attendues = [
-            "@ Ip du client",
-            "date de creation",
-            "nom prenom",
-            "numero de telephone",
-            "Qte",
-            "Wilaya",
-            "Commune",
-            "SKU d'article",
-            "Boutique",
-            "montant total"
-        ]
-
-        # Mapping vers les colonnes du modèle
-        mapping_colonnes = {
-            "@ Ip du client": "@_Ip_du_client",
-            "nom prenom": "nom_prenom",
-            "SKU d'article": "SKU_d_article",   # correction ici
-            "date de creation": "date_de_creation",
-            "numero de telephone": "numero_de_telephone",
-            "montant total": "montant_total"
-        }
-
-        if set(df_uploaded.columns) == set(colonnes_attendues):
+        # Seules les colonnes du schéma sont lues, avec leur type (schema.py)
+        try:
+            df_uploaded, mapping = read_upload(uploaded_file.getvalue(), uploaded_file.name)
+        except SchemaError as e:
+            df_uploaded = None
+            st.error(f"❌ Le fichier n'est pas valide. {e}")
+            if e.missing:
+                st.write("Colonnes attendues :")
+                st.dataframe(upload_schema.describe(), hide_index=True)
+                st.write("Colonnes trouvées :", [c for c in e.found if c is not None])
+
+        if df_uploaded is not None:
             st.success("Fichier valide. Prêt pour la prédiction.")
+            renommees = {k: v for k, v in mapping.items() if k != v}
+            if renommees:
+                st.caption("Colonnes reconnues : " + ", ".join(f"{k} → {v}" for k, v in renommees.items()))
+
+            format_export = st.selectbox("Format du fichier de résultats", list(EXPORT_FORMATS),
+                                         format_func=lambda f: EXPORT_FORMATS[f][0])
 
             if st.button("Prédire"):
-                try:
-                    # Charger modèle + encodeur````````
-                    model = joblib.load("lgb_model.joblib")
-                    encoder = None
-                    if os.path.exists("ordinal_encoder.joblib"):
-                        encoder = joblib.load("ordinal_encoder.joblib")
-
-                    # Renommer les colonnes selon le mapping
-                    X_new = df_uploaded.rename(columns=mapping_colonnes).copy()
-
-                    # -------- Prétraitement identique à l’entraînement --------
-                    # Gérer la colonne date
-                    date_cols = [c for c in X_new.columns if "date" in c.lower() or "creation" in c.lower()]
-                    if len(date_cols) > 0:
-                        date_col = date_cols[0]
-                        X_new[date_col] = pd.to_datetime(X_new[date_col], errors="coerce")
-                        X_new["year"] = X_new[date_col].dt.year.fillna(-1).astype(int)
-                        X_new["month"] = X_new[date_col].dt.month.fillna(-1).astype(int)
-                        X_new["day"] = X_new[date_col].dt.day.fillna(-1).astype(int)
-                        X_new["hour"] = X_new[date_col].dt.hour.fillna(-1).astype(int)
-                        X_new["minute"] = X_new[date_col].dt.minute.fillna(-1).astype(int)
-                        X_new["dayofweek"] = X_new[date_col].dt.dayofweek.fillna(-1).astype(int)
-                        X_new["ts"] = X_new[date_col].astype("int64").fillna(-1) // 10**9
-                        X_new = X_new.drop(columns=[date_col])
-
-                    # Gérer NaN
-                    num_cols = X_new.select_dtypes(include=[np.number]).columns.tolist()
-                    cat_cols = X_new.select_dtypes(include=["object", "category"]).columns.tolist()
-                    X_new[num_cols] = X_new[num_cols].fillna(-999)
-                    X_new[cat_cols] = X_new[cat_cols].fillna("NA")
-
-                    # Encoder les colonnes catégorielles
-                    if encoder is not None and len(cat_cols) > 0:
-                        X_new[cat_cols] = encoder.transform(X_new[cat_cols])
-
-                    # S’assurer que tout est numérique
-                    X_new = X_new.astype(float)
-                    # Aligner les colonnes avec le modèle (exactement celles de l'entraînement)
-                    expected_features = model.booster_.feature_name()
-
-                    X_new = X_new.reindex(columns=expected_features, fill_value=-999)
-
-                    # -------- Prédiction --------
-                    y_proba = model.predict_proba(X_new)[:, 1]
-                    y_pred = (y_proba >= 0.5).astype(int)
-
-                    # Ajouter la colonne résultat
-                    df_uploaded["Fausse_commande_predite"] = y_pred
-
-                    st.success("Prédictions effectuées avec succès.")
-                    st.dataframe(df_uploaded)
-
-                    # Option de téléchargement
-                    output_path = "predictions_result.xlsx"
-                    df_uploaded.to_excel(output_path, index=False)
-                    with open(output_path, "rb") as f:
-                        st.download_button("📥 Télécharger le fichier avec prédictions", f, file_name="predictions_result.xlsx")
-
-                except Exception as e:
-                    st.error(f"❌ Erreur lors de la prédiction : {e}")
+                # Travail en arrière-plan : il survit aux reruns et ne bloque pas le script
+                job_id = job_queue.submit(run_prediction, get_model_store(), df_uploaded, mapping, format_export,
+                                          label=uploaded_file.name)
+                st.session_state.prediction = {"fichier": uploaded_file.file_id, "job": job_id}
+                st.session_state.setdefault("jobs", []).append(job_id)
+
+            prediction = st.session_state.get("prediction")
+            job = None
+            if prediction is not None and prediction["fichier"] == uploaded_file.file_id:
+                job = job_queue.get(prediction["job"])
+
+            if job is not None and not job.finished:
+                st.progress(job.progress, text=f"Travail {job.id} {job.status}" + (f" : {job.message}" if job.message else ""))
+                st.caption(f"Attente dans la file : {job.wait_seconds:.1f}s, exécution : {job.run_seconds:.1f}s")
+                if st.button("Annuler la prédiction"):
+                    job_queue.cancel(job.id)
+                # Rafraîchissement tant que le travail n'est pas terminé
+                time.sleep(JOB_REFRESH_SECONDS)
+                st.rerun()
+            elif job is not None and job.status == FAILED:
+                st.error(f"❌ Erreur lors de la prédiction : {job.error}")
+            elif job is not None and job.status == CANCELLED:
+                st.warning(f"Prédiction annulée (travail {job.id}).")
+            elif job is not None:
+                resultats = job.result["resultats"]
+                st.success("Prédictions effectuées avec succès.")
+                st.caption(
+                    f"⏱️ {len(resultats)} commandes scorées en {job.result['duree'] * 1000:.0f} ms"
+                    + (f" (chargement du modèle : {job.result['chargement'] * 1000:.0f} ms)"
+                       if job.result["recharge"] else " (modèle déjà en cache)")
+                    + f" ; travail {job.id} : attente {job.wait_seconds * 1000:.0f} ms,"
+                    f" exécution {job.run_seconds * 1000:.0f} ms (export compris)"
+                )
 
-        else:
-            st.error("❌ Le fichier n'est pas valide. Colonnes incorrectes.")
-            st.write("Colonnes attendues :", colonnes_attendues)
-            st.write("Colonnes trouvées :", list(df_uploaded.columns))
+                # -------- Synthèse calculée côté serveur (results_view.py) --------
+                resume = summary(resultats)
+                m1, m2, m3, m4 = st.columns(4)
+                m1.metric("Commandes", f"{resume['commandes']:,}".replace(",", " "))
+                m2.metric("Fausses commandes prédites", f"{resume['fausses']:,}".replace(",", " "))
+                m3.metric("Taux de fausses commandes", f"{resume['taux']:.1%}")
+                m4.metric("Probabilité moyenne", f"{resume['proba_moyenne']:.3f}")
+
+                col_hist, col_top = st.columns(2)
+                with col_hist:
+                    st.markdown("**Distribution des probabilités**")
+                    fig = px.bar(histogram(resultats[PROBA_COL]), x="Probabilité", y="Commandes")
+                    fig.update_layout(height=320, margin=dict(l=10, r=10, t=10, b=10))
+                    st.plotly_chart(fig, use_container_width=True)
+                with col_top:
+                    st.markdown(f"**Les {TOP_RISK} commandes les plus risquées**")
+                    st.dataframe(top_risk(resultats), hide_index=True, use_container_width=True)
+
+                # -------- Tableau paginé : seule la page affichée part au navigateur --------
+                f1, f2, f3 = st.columns([1, 1, 2])
+                seulement_fausses = f1.checkbox("Fausses commandes seulement", key="res_fausses")
+                proba_min = f2.slider("Probabilité minimale", 0.0, 1.0, 0.0, 0.05, key="res_proba")
+                recherche = f3.text_input("Rechercher (IP, nom, boutique...)", key="res_recherche")
+                lignes = filter_rows(resultats, seulement_fausses, proba_min, recherche)
+
+                t1, t2, t3, t4 = st.columns(4)
+                colonnes_tri = [PROBA_COL] + [c for c in resultats.columns if c != PROBA_COL]
+                tri = t1.selectbox("Trier par", colonnes_tri, key="res_tri")
+                croissant = t2.selectbox("Ordre", ["Décroissant", "Croissant"], key="res_ordre") == "Croissant"
+                taille_page = t3.selectbox("Lignes par page", PAGE_SIZES, index=1, key="res_taille")
+                page = t4.number_input("Page", min_value=1, value=1, step=1, key="res_page")
+
+                page_df, page, n_pages = page_of(resultats, lignes, tri, croissant, page, taille_page)
+                st.dataframe(page_df, use_container_width=True)
+                debut = (page - 1) * taille_page
+                st.caption(
+                    f"Lignes {min(debut + 1, len(lignes))}–{debut + len(page_df)} sur {len(lignes)} "
+                    f"(page {page}/{n_pages}, {len(resultats)} commandes au total)"
+                )
+
+                # Option de téléchargement : fichier sérialisé en mémoire (export.py), une fois par format
+                exports = job.result["exports"]
+                if format_export not in exports:
+                    start = time.perf_counter()
+                    exports[format_export] = (export_bytes(resultats, format_export), time.perf_counter() - start)
+                contenu, duree_export = exports[format_export]
+                st.download_button("📥 Télécharger le fichier avec prédictions", contenu,
+                                   file_name=f"predictions_result.{format_export}",
+                                   mime=EXPORT_FORMATS[format_export][1])
+                st.caption(f"Fichier de {len(contenu) / 1024:.0f} Ko préparé en {duree_export * 1000:.0f} ms")
 
+            # Travaux de la session (résultats récupérables par identifiant tant qu'ils sont conservés)
+            mes_travaux = job_queue.jobs(st.session_state.get("jobs", []))
+            if mes_travaux:
+                with st.expander(f"Travaux de prédiction ({len(mes_travaux)})"):
+                    st.dataframe(pd.DataFrame([j.as_row() for j in mes_travaux]), hide_index=True, use_container_width=True)
 
 
+
+# =========================
+# 12. Métriques de performance (sidebar)
+# =========================
+with st.sidebar:
+    if st.checkbox("Afficher les métriques de performance", key="show_perf"):
+        st.caption(f"Version des données : {data_version}")
+        if st.session_state.payloads:
+            tailles = pd.DataFrame(
+                {"Figure": list(st.session_state.payloads), "Taille (Ko)": [v / 1024 for v in st.session_state.payloads.values()]}
+            )
+            st.dataframe(tailles, hide_index=True, use_container_width=True)
+            st.caption(f"Total envoyé : {sum(st.session_state.payloads.values()) / 1024:.1f} Ko")
+        stats = figure_cache.stats()
+        st.caption(
+            f"Cache de figures : {stats['hits']} hits / {stats['misses']} misses "
+            f"({stats['taux de hit']:.0%}), {stats['entrées']} entrées, {stats['évictions']} évictions"
+        )
+        travaux = job_queue.stats()
+        st.caption("File de prédictions : " + ", ".join(f"{n} {statut}" for statut, n in travaux.items()))
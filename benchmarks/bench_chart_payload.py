@@ -0,0 +1,41 @@
+import argparse
+import time
+import plotly.express as px
+
+from benchmarks.synthetic import make_orders
+from charts import decimate, payload_size
+from cube import build_cube, rollup
+from data_store import apply_dtypes
+
+# =========================
+# Benchmark : taille du JSON des camemberts (lignes brutes vs comptes agrégés)
+# =========================
+# Usage : python -m benchmarks.bench_chart_payload --rows 10000 100000 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--column", default="Boutique")
+    args = parser.parse_args()
+
+    print(f"📊 Camembert '{args.column}' : taille de la figure envoyée au navigateur")
+    for n_rows in args.rows:
+        df = apply_dtypes(make_orders(n_rows))
+
+        start = time.perf_counter()
+        brut = payload_size(px.pie(df, names=args.column, hole=0.4))
+        t_brut = time.perf_counter() - start
+
+        cube = build_cube(df)
+        start = time.perf_counter()
+        counts = decimate(rollup(cube, args.column), args.column)
+        agrege = payload_size(px.pie(names=counts.index.astype(str), values=counts.values, hole=0.4))
+        t_agrege = time.perf_counter() - start
+
+        print(f"   {n_rows:>9} lignes : brut {brut / 1024:10.1f} Ko ({t_brut * 1000:7.1f} ms)"
+              f"  |  agrégé {agrege / 1024:6.1f} Ko ({t_agrege * 1000:6.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
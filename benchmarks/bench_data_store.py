@@ -0,0 +1,65 @@
+import os
+import argparse
+import tempfile
+import time
+import pandas as pd
+
+from benchmarks.synthetic import make_orders
+from data_store import apply_dtypes, read_store, write_store
+
+# =========================
+# Benchmark : pd.read_excel vs store Parquet partitionné
+# =========================
+# Usage : python -m benchmarks.bench_data_store --rows 3000000
+# Une feuille Excel est limitée à 1 048 576 lignes : la lecture Excel est
+# mesurée sur --excel-rows lignes et le store sur le même volume puis sur --rows.
+
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=3_000_000)
+    parser.add_argument("--excel-rows", type=int, default=200_000)
+    args = parser.parse_args()
+    excel_rows = min(args.excel_rows, args.rows, EXCEL_MAX_ROWS)
+
+    print(f"🧪 Génération de {args.rows} commandes synthétiques")
+    df = make_orders(args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        excel_path = os.path.join(tmp, "orders.xlsx")
+        small_store = os.path.join(tmp, "store_small")
+        full_store = os.path.join(tmp, "store_full")
+
+        print(f"✍️  Écriture Excel ({excel_rows} lignes) et des stores Parquet")
+        df.iloc[:excel_rows].to_excel(excel_path, index=False)
+        write_store(apply_dtypes(df.iloc[:excel_rows].copy()), small_store)
+        write_store(apply_dtypes(df.copy()), full_store)
+
+        t_excel, _ = timed(lambda: apply_dtypes(pd.read_excel(excel_path)), repeat=1)
+        t_small, _ = timed(lambda: read_store(small_store))
+        t_full, full = timed(lambda: read_store(full_store))
+
+    mem_mb = full.memory_usage(deep=True).sum() / 1e6
+    print(f"\n📊 Résultats ({excel_rows} lignes)")
+    print(f"   read_excel  : {t_excel:8.3f}s  ({excel_rows / t_excel:,.0f} lignes/s)")
+    print(f"   store       : {t_small:8.3f}s  ({excel_rows / t_small:,.0f} lignes/s)  x{t_excel / t_small:.0f}")
+    print(f"\n📊 Store complet ({args.rows} lignes)")
+    print(f"   store       : {t_full:8.3f}s  ({args.rows / t_full:,.0f} lignes/s)")
+    print(f"   read_excel  : ~{args.rows * t_excel / excel_rows:7.1f}s  (extrapolé)")
+    print(f"   mémoire DataFrame : {mem_mb:,.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
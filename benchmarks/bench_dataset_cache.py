@@ -0,0 +1,60 @@
+import os
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import pandas as pd
+
+from dataset_cache import cache_key, cache_size, load_datasets, save_datasets
+from features import FeaturePipeline
+from ingest import read_table
+from prediction import datasets_in_memory, datasets_out_of_core
+
+# =========================
+# Benchmark : construction des Datasets LightGBM vs relecture du cache
+# =========================
+# Usage : python -m benchmarks.bench_dataset_cache --file prediction.xlsx --scale 1 20 80
+# Construction = lecture du fichier + features + split + bins (ce que prediction.py
+# refait à chaque entraînement sans cache), en mémoire puis --out-of-core.
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="prediction.xlsx")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 20, 80])
+    args = parser.parse_args()
+
+    df = read_table(args.file)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "historique.parquet")
+        root = os.path.join(tmp, "cache")
+        for scale in args.scale:
+            pd.concat([df] * scale, ignore_index=True).to_parquet(src, index=False)
+            print(f"🗂️ {len(df) * scale} commandes")
+            for mode in ("memory", "out_of_core"):
+                pipeline = FeaturePipeline()
+                if mode == "memory":
+                    t_build, (train_set, valid_set, X_test, y_test) = timed(datasets_in_memory, src, None, pipeline)
+                else:
+                    t_build, (train_set, valid_set, X_test, y_test) = timed(
+                        datasets_out_of_core, src, pipeline, tmp, 100_000)
+                key = cache_key([src], pipeline, mode)
+                t_save, _ = timed(save_datasets, key, train_set, valid_set, X_test, y_test, pipeline, root)
+                t_load, cached = timed(load_datasets, key, root)
+                cached[2].close()
+                if mode == "out_of_core":
+                    X_test.close()
+                print(f"   {mode:<12} construction {t_build:7.2f}s  mise en cache {t_save:5.2f}s  "
+                      f"relecture {t_load:5.2f}s  ({cache_size(key, root) / 1024 ** 2:6.1f} Mo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import argparse
+import tempfile
+import time
+
+from benchmarks.synthetic import make_scoring_orders
+from features import ENCODINGS, FeaturePipeline, load_pipeline, save_pipeline
+
+# =========================
+# Benchmark : taille, chargement et coût par ligne des modes d'encodage
+# =========================
+# Usage : python -m benchmarks.bench_encoding --rows 1000000 --customers 500000 --max-categories 10000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--customers", type=int, default=500_000)
+    parser.add_argument("--max-categories", type=int, default=10_000, help="Plafond du mode frequency")
+    args = parser.parse_args()
+
+    df = make_scoring_orders(args.rows, args.customers)
+    print(f"🔤 {args.rows} commandes, {args.customers} clients distincts")
+    with tempfile.TemporaryDirectory() as tmp:
+        for encoding in ENCODINGS:
+            start = time.perf_counter()
+            max_categories = args.max_categories if encoding == "frequency" else None
+            pipeline = FeaturePipeline(encoding=encoding, max_categories=max_categories).fit(df)
+            t_fit = time.perf_counter() - start
+
+            path = os.path.join(tmp, f"{encoding}.joblib")
+            save_pipeline(pipeline, path)
+            start = time.perf_counter()
+            pipeline = load_pipeline(path)
+            t_load = time.perf_counter() - start
+
+            start = time.perf_counter()
+            pipeline.transform(df)
+            t_transform = time.perf_counter() - start
+
+            print(f"   {encoding:<9} : {os.path.getsize(path) / 1024 ** 2:7.2f} Mo, fit {t_fit:5.2f}s, "
+                  f"chargement {t_load * 1000:6.1f} ms, transform {args.rows / t_transform:>10,.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import argparse
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+from export import export_bytes
+from ingest import read_table
+from score import peak_rss_mb
+
+# =========================
+# Benchmark : export des résultats, to_excel sur disque vs buffer en mémoire
+# =========================
+# Usage : python -m benchmarks.bench_export --file predire.xlsx --scale 1 10
+# Chaque méthode tourne dans un processus neuf : le pic mémoire mesuré (ru_maxrss)
+# est celui de l'export seul, au-delà du DataFrame déjà chargé.
+
+warnings.filterwarnings("ignore", message="Trying to unpickle")
+
+
+def old_export(df, tmp):
+    # Ancien comportement de BI.py : to_excel vers un chemin fixe, puis relecture
+    path = os.path.join(tmp, "predictions_result.xlsx")
+    df.to_excel(path, index=False)
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def run(method, src, scale, tmp):
+    df = read_table(src)
+    if scale > 1:
+        df = pd.concat([df] * scale, ignore_index=True)
+    df["Fausse_commande_predite"] = np.zeros(len(df), dtype=np.int8)
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    data = old_export(df, tmp) if method == "to_excel" else export_bytes(df, method)
+    elapsed = time.perf_counter() - start
+    return len(df), elapsed, len(data), peak_rss_mb() - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="predire.xlsx")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Copie Parquet de l'entrée : chaque processus la relit en quelques ms
+        src = os.path.join(tmp, "commandes.parquet")
+        read_table(args.file).to_parquet(src, index=False)
+        for scale in args.scale:
+            for method in ["to_excel", "xlsx", "csv", "parquet"]:
+                with ProcessPoolExecutor(1) as pool:
+                    n_rows, elapsed, size, peak = pool.submit(run, method, src, scale, tmp).result()
+                label = "to_excel + relecture" if method == "to_excel" else f"export_bytes {method}"
+                print(f"   {n_rows:>8} lignes  {label:<22} {elapsed:7.2f}s  "
+                      f"{size / 1024 ** 2:6.1f} Mo  pic mémoire +{peak:6.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import argparse
+import copy
+import tempfile
+import time
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from dataset_cache import make_datasets
+from features import FeaturePipeline, find_date_column, normalize_columns
+from ingest import read_table
+from prediction import DEFAULT_INCREMENTAL_ROUNDS, MODEL_PARAMS, find_target, fit_booster, split_sets, warm_start
+from scoring import model_proba
+
+# =========================
+# Benchmark : mise à jour incrémentale (--incremental) vs réentraînement complet
+# =========================
+# Usage : python -m benchmarks.bench_incremental --file prediction.xlsx --new-fraction 0.2
+# Les commandes sont coupées par date : les plus anciennes forment l'historique
+# (modèle de départ), les plus récentes le nouveau lot étiqueté. Un même jeu de
+# test (15 % de chaque partie) est mis de côté et n'est vu par aucun modèle.
+# Les deux chemins comptent la lecture de leur classeur (sans cache Parquet) :
+# tout l'historique pour le réentraînement complet, le nouveau lot seul sinon.
+
+
+def fit_full(df, target_col):
+    # Même enchaînement que prediction.py sans option
+    pipeline = FeaturePipeline()
+    X = pipeline.fit_transform(df.drop(columns=[target_col]))
+    X_train, X_val, _, y_train, y_val, _ = split_sets(X, df[target_col].astype(int))
+    train_set, valid_set = make_datasets(X_train, y_train, X_val, y_val, pipeline.feature_names)
+    return fit_booster(MODEL_PARAMS, train_set, valid_set), pipeline
+
+
+def read(path):
+    df = read_table(path, cache=False)
+    df.columns = normalize_columns(df.columns)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="prediction.xlsx")
+    parser.add_argument("--new-fraction", type=float, default=0.2)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_INCREMENTAL_ROUNDS)
+    args = parser.parse_args()
+
+    df = read(args.file)
+    target_col = find_target(df.columns)
+    df = df.sort_values(find_date_column(df.columns), kind="stable", ignore_index=True)
+    cut = int(len(df) * (1 - args.new_fraction))
+    old, new = df.iloc[:cut], df.iloc[cut:]
+    old, old_test = train_test_split(old, test_size=0.15, stratify=old[target_col], random_state=0)
+    new, new_test = train_test_split(new, test_size=0.15, stratify=new[target_col], random_state=0)
+    test = pd.concat([old_test, new_test], ignore_index=True)
+    print(f"🗂️ historique {len(old)} commandes, nouveau lot {len(new)}, test commun {len(test)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        all_path = os.path.join(tmp, "historique.xlsx")
+        new_path = os.path.join(tmp, "nouvelles.xlsx")
+        pd.concat([old, new], ignore_index=True).to_excel(all_path, index=False)
+        new.to_excel(new_path, index=False)
+
+        base_model, base_pipeline = fit_full(old.reset_index(drop=True), target_col)
+
+        start = time.perf_counter()
+        full_model, full_pipeline = fit_full(read(all_path), target_col)
+        t_full = time.perf_counter() - start
+
+        pipeline = copy.deepcopy(base_pipeline)
+        start = time.perf_counter()
+        inc_model, _, _, _ = warm_start(base_model, pipeline, read(new_path), target_col, args.rounds)
+        t_inc = time.perf_counter() - start
+
+    def auc(model, pipe, part):
+        return roc_auc_score(part[target_col].astype(int), model_proba(model, pipe.transform(part)))
+
+    print(f"   {'':<26} {'durée':>8} {'arbres':>7} {'AUC test':>9} {'AUC nouv.':>10}")
+    for label, model, pipe, elapsed in [
+        ("modèle de départ", base_model, base_pipeline, None),
+        ("réentraînement complet", full_model, full_pipeline, t_full),
+        (f"incrémental ({args.rounds} arbres max)", inc_model, pipeline, t_inc),
+    ]:
+        duration = "" if elapsed is None else f"{elapsed:.2f}s"
+        print(f"   {label:<26} {duration:>8} {model.current_iteration():>7} "
+              f"{auc(model, pipe, test):>9.5f} {auc(model, pipe, new_test):>10.5f}")
+    print(f"⏱️ incrémental {t_full / t_inc:.1f}x plus rapide, "
+          f"écart d'AUC test {auc(inc_model, pipeline, test) - auc(full_model, full_pipeline, test):+.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import argparse
+import tempfile
+import time
+import openpyxl
+import pandas as pd
+
+from benchmarks.synthetic import make_scoring_orders
+from ingest import EXCEL_ENGINE, read_excel, read_table
+
+# =========================
+# Benchmark : lecture des classeurs de commandes selon le moteur
+# =========================
+# Usage : python -m benchmarks.bench_ingest --files prediction.xlsx predire.xlsx --scale 10
+# Pour chaque classeur (réels, puis synthétique scale x plus grand) : pd.read_excel,
+# lecture en flux d'ingest.py, cache Parquet (premier passage puis relecture),
+# et les mêmes données en CSV et en Parquet.
+
+
+def write_xlsx(df, path):
+    # openpyxl write_only : génération du gros classeur synthétique en mémoire bornée
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    for row in df.astype(object).itertuples(index=False):
+        ws.append(list(row))
+    wb.save(path)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def bench(path, tmp):
+    name = os.path.basename(path)
+    # Copie dans tmp : le cache Parquet (.ingest_cache/) n'est pas écrit à côté des fichiers du dépôt
+    src = os.path.join(tmp, name)
+    if os.path.abspath(path) != os.path.abspath(src):
+        shutil.copy(path, src)
+
+    t_pandas, ref = timed(lambda: pd.read_excel(src))
+    print(f"📄 {name} : {len(ref)} lignes x {ref.shape[1]} colonnes, {os.path.getsize(src) / 1024 ** 2:.1f} Mo")
+    results = [("pd.read_excel (openpyxl)", t_pandas, True)]
+
+    t, df = timed(lambda: read_excel(src))
+    results.append((f"ingest, lecture en flux ({EXCEL_ENGINE})", t, df.equals(ref)))
+    t, df = timed(lambda: read_table(src))
+    results.append(("ingest, cache Parquet (1re lecture)", t, df.equals(ref)))
+    t, df = timed(lambda: read_table(src))
+    results.append(("ingest, cache Parquet (relecture)", t, df.equals(ref)))
+
+    csv_path, parquet_path = os.path.join(tmp, name + ".csv"), os.path.join(tmp, name + ".parquet")
+    ref.to_csv(csv_path, index=False)
+    ref.to_parquet(parquet_path, index=False)
+    t, _ = timed(lambda: read_table(csv_path))
+    results.append(("CSV (pd.read_csv)", t, None))
+    t, _ = timed(lambda: read_table(parquet_path))
+    results.append(("Parquet (pd.read_parquet)", t, None))
+
+    for label, t, same in results:
+        parity = "" if same is None else ("  identique" if same else "  ⚠️ différent")
+        print(f"   {label:<38} {t:7.2f}s  x{t_pandas / t:6.1f}{parity}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", nargs="+", default=["prediction.xlsx", "predire.xlsx"])
+    parser.add_argument("--scale", type=int, default=10,
+                        help="Taille du classeur synthétique, en multiple du premier fichier")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in args.files:
+            bench(path, tmp)
+
+        if args.scale:
+            n_rows = args.scale * len(read_table(args.files[0], cache=False))
+            path = os.path.join(tmp, f"synthetique_x{args.scale}.xlsx")
+            start = time.perf_counter()
+            df = make_scoring_orders(n_rows, max(1, n_rows // 5))
+            write_xlsx(df, path)
+            print(f"🧪 {n_rows} commandes synthétiques écrites en {time.perf_counter() - start:.1f}s")
+            bench(path, tmp)
+
+
+if __name__ == "__main__":
+    main()
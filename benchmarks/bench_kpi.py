@@ -0,0 +1,83 @@
+import argparse
+import time
+import tracemalloc
+import pandas as pd
+
+from benchmarks.synthetic import make_orders
+from data_store import apply_dtypes
+from kpi import KPI_COLUMNS, compute_kpis
+
+# =========================
+# Micro-benchmark : KPIs par masques + copies filtrées vs kpi.compute_kpis
+# =========================
+# Usage : python -m benchmarks.bench_kpi --rows 5000000
+
+
+def kpis_masques(df):
+    # Ancienne version des pages Confirmation / Livraison
+    total_cmds = len(df)
+    confirmed = len(df[df["Etat_Commande"] == "Confirmée"])
+    cancelled = len(df[df["Etat_Commande"] == "Annulée"])
+    pending = len(df[df["Etat_Commande"] == "En confirmation"])
+    confirmed = len(df[df["Etat_Commande"] == "Confirmée"])
+    cancelled = len(df[df["Etat_Commande"] == "Annulée"])
+    livree = len(df[df["Etat_Livraison"] == "Livrée"])
+    expediee = len(df[df["Etat_Stock"] == "Expédiée"])
+    retour = len(df[df["Etat_Livraison"] == "Retour"])
+    en_livraison = len(df[df["Etat_Livraison"] == "En livraison"])
+    preparation_stock = len(df[df["Etat_Livraison"] == "Preparation Stock"])
+    return (total_cmds, confirmed, cancelled, pending, livree, expediee,
+            retour, en_livraison, preparation_stock)
+
+
+def mesurer(fn, df, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    fn(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    print(f"🧪 Génération de {args.rows} commandes synthétiques")
+    # Génération par blocs des seules colonnes utiles (tient en mémoire à 5M lignes)
+    taille_bloc = 500_000
+    brut = pd.concat(
+        [make_orders(min(taille_bloc, args.rows - i), seed=i)[KPI_COLUMNS]
+         for i in range(0, args.rows, taille_bloc)],
+        ignore_index=True,
+    )
+    types = apply_dtypes(brut.copy())
+
+    ancien = kpis_masques(types)
+    nouveau = compute_kpis(types)
+    assert ancien == (
+        nouveau["total"], nouveau["confirmees"], nouveau["annulees"], nouveau["en_confirmation"],
+        nouveau["livrees"], nouveau["expediees"], nouveau["retours"], nouveau["en_livraison"],
+        nouveau["preparation_stock"],
+    )
+
+    print(f"\n📊 {args.rows} lignes : temps (meilleur de 3) / pic d'allocation")
+    for label, fn, frame in [
+        ("masques, colonnes texte     ", kpis_masques, brut),
+        ("masques, colonnes category  ", kpis_masques, types),
+        ("compute_kpis, texte         ", compute_kpis, brut),
+        ("compute_kpis, category      ", compute_kpis, types),
+    ]:
+        t, peak = mesurer(fn, frame)
+        print(f"   {label}: {t * 1000:9.1f} ms  {peak:9.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
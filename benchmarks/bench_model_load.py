@@ -0,0 +1,51 @@
+import argparse
+import time
+import warnings
+import pandas as pd
+
+from model_store import ModelStore
+from scoring import load_artifacts, predict_proba
+
+# =========================
+# Benchmark : prédiction avec joblib.load à chaque clic vs cache du modèle
+# =========================
+# Usage : python -m benchmarks.bench_model_load --file predire.xlsx --rows 100 --repeat 5
+
+warnings.filterwarnings("ignore", message="Trying to unpickle")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="predire.xlsx")
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mmap", action="store_true")
+    args = parser.parse_args()
+
+    df = pd.read_excel(args.file, nrows=args.rows)
+    mmap_mode = "r" if args.mmap else None
+    print(f"🤖 Prédiction de {len(df)} commandes, {args.repeat} clics (mmap : {mmap_mode})")
+
+    # Ancien comportement : chargement des artefacts à chaque clic
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        model, pipeline = load_artifacts(mmap_mode=mmap_mode)
+        predict_proba(df, model, pipeline)
+        times.append(time.perf_counter() - start)
+    print("   joblib.load à chaque clic : " + ", ".join(f"{t * 1000:.0f}" for t in times) + " ms")
+
+    # Cache par processus : seul le premier clic charge les fichiers
+    store = ModelStore(mmap_mode=mmap_mode)
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        model, pipeline = store.get()
+        predict_proba(df, model, pipeline)
+        times.append(time.perf_counter() - start)
+    print("   ModelStore               : " + ", ".join(f"{t * 1000:.0f}" for t in times) + " ms"
+          f"  (chargement : {store.last_load_seconds * 1000:.0f} ms, {store.version} chargement(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import os
+import sys
+import argparse
+import contextlib
+import io
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import prediction
+from ingest import read_table
+from score import peak_rss_mb
+
+# =========================
+# Benchmark : pic mémoire de prediction.py, en mémoire vs --out-of-core
+# =========================
+# Usage : python -m benchmarks.bench_out_of_core --file prediction.xlsx --scale 20 80
+# Le classeur répété scale fois est écrit en Parquet, puis entraîné en entier dans
+# un processus neuf par mode : le pic de mémoire résidente (ru_maxrss) est celui
+# de tout prediction.py.
+
+warnings.filterwarnings("ignore", message="Trying to unpickle")
+
+
+def write_orders(src, scale, path):
+    df = read_table(src)
+    pd.concat([df] * scale, ignore_index=True).to_parquet(path, index=False)
+    return len(df) * scale, os.path.getsize(path)
+
+
+def baseline():
+    # Interpréteur + pandas + LightGBM chargés, sans données
+    return peak_rss_mb()
+
+
+def train(src, out_of_core, tmp):
+    os.chdir(tmp)
+    sys.argv = ["prediction.py", "--data", src, "--no-history", "--no-cache"] + (["--out-of-core"] if out_of_core else [])
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        prediction.main()
+    return time.perf_counter() - start, peak_rss_mb()
+
+
+def in_process(fn, *args):
+    with ProcessPoolExecutor(1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default="prediction.xlsx")
+    parser.add_argument("--scale", type=int, nargs="+", default=[20, 80])
+    args = parser.parse_args()
+
+    print(f"   base (imports seuls) : {in_process(baseline):.0f} Mo")
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "historique.parquet")
+        for scale in args.scale:
+            n_rows, size = in_process(write_orders, os.path.abspath(args.file), scale, src)
+            print(f"🗂️ {n_rows} commandes ({size / 1024 ** 2:.0f} Mo en Parquet)")
+            for out_of_core in (False, True):
+                elapsed, peak = in_process(train, src, out_of_core, tmp)
+                label = "--out-of-core" if out_of_core else "en mémoire"
+                print(f"   {label:<14} {elapsed:7.1f}s  pic mémoire {peak:6.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
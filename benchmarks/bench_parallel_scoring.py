@@ -0,0 +1,70 @@
+import os
+import argparse
+import tempfile
+import time
+import warnings
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from benchmarks.synthetic import make_scoring_orders
+from features import PIPELINE_PATH
+from score import score_file_parallel
+from scoring import ENCODER_PATH, MODEL_PATH
+
+# =========================
+# Benchmark : scoring parallèle, efficacité de 1 à N processus
+# =========================
+# Usage : python -m benchmarks.bench_parallel_scoring --rows 10000000 --workers 1 2 4 8
+
+warnings.filterwarnings("ignore", message="Trying to unpickle")
+
+GENERATION_CHUNK = 500_000
+ROW_GROUP = 100_000
+
+
+def write_synthetic(path, n_rows):
+    # Fichier Parquet généré par tranches (mémoire bornée), row groups de ROW_GROUP lignes
+    writer = None
+    for i, start in enumerate(range(0, n_rows, GENERATION_CHUNK)):
+        n = min(GENERATION_CHUNK, n_rows - start)
+        df = make_scoring_orders(n, max(1, n // 5), seed=i)
+        for col in df.select_dtypes("category").columns:
+            df[col] = df[col].astype(str)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(path, table.schema)
+        writer.write_table(table, row_group_size=ROW_GROUP)
+    writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--chunk-size", type=int, default=200_000)
+    args = parser.parse_args()
+
+    paths = (MODEL_PATH, PIPELINE_PATH, ENCODER_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "commandes.parquet")
+        start = time.perf_counter()
+        write_synthetic(src, args.rows)
+        print(f"🧪 {args.rows} commandes synthétiques générées en {time.perf_counter() - start:.1f}s"
+              f" ({os.path.getsize(src) / 1024 ** 2:.0f} Mo), {os.cpu_count()} coeur(s) disponible(s)")
+
+        base = None
+        for workers in args.workers:
+            dst = os.path.join(tmp, f"scored_{workers}.parquet")
+            start = time.perf_counter()
+            n_rows, _ = score_file_parallel(src, dst, paths, workers, args.chunk_size)
+            elapsed = time.perf_counter() - start
+            base = base or elapsed
+            speedup = base / elapsed
+            print(f"   {workers:>3} worker(s) : {elapsed:7.1f}s, {n_rows / elapsed:>10,.0f} lignes/s, "
+                  f"accélération x{speedup:4.2f}, efficacité {speedup / workers:5.0%}")
+            os.remove(dst)
+
+
+if __name__ == "__main__":
+    main()
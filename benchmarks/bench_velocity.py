@@ -0,0 +1,44 @@
+import argparse
+import time
+
+from benchmarks.synthetic import make_scoring_orders
+from features import normalize_columns
+from velocity import VelocityStore, velocity_features
+
+# =========================
+# Benchmark : features de vélocité hors ligne (vectorisé) vs en ligne (store)
+# =========================
+# Usage : python -m benchmarks.bench_velocity --rows 1000000 5000000 --online-rows 200000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--customers-ratio", type=float, default=0.2, help="Clients distincts / commandes")
+    parser.add_argument("--online-rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print("⚡ Vélocité sur 3 identifiants x 3 fenêtres (27 features)")
+    for n_rows in args.rows:
+        df = make_scoring_orders(n_rows, max(1, int(n_rows * args.customers_ratio)))
+        df.columns = normalize_columns(df.columns)
+
+        start = time.perf_counter()
+        offline = velocity_features(df)
+        t_offline = time.perf_counter() - start
+        print(f"   hors ligne {n_rows:>9} commandes : {t_offline:6.2f}s ({n_rows / t_offline:>10,.0f} lignes/s)")
+
+        # En ligne : rejoue les premières commandes (ordre chronologique) et compare
+        head = df.sort_values("date_de_creation", kind="stable").iloc[:args.online_rows]
+        store = VelocityStore()
+        start = time.perf_counter()
+        online = store.update_frame(head)
+        t_online = time.perf_counter() - start
+        identical = online.equals(velocity_features(head))
+        print(f"   en ligne   {len(head):>9} commandes : {t_online / len(head) * 1e6:6.1f} µs/commande"
+              f", {len(store)} identifiants suivis, identique au hors ligne : {'oui' if identical else 'NON'}")
+        del df, offline
+
+
+if __name__ == "__main__":
+    main()
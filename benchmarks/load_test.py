@@ -0,0 +1,87 @@
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+
+from benchmarks.synthetic import make_scoring_orders
+
+# =========================
+# Test de charge du service de scoring (serve.py)
+# =========================
+# Usage : python serve.py &  puis
+#         python -m benchmarks.load_test --concurrency 1 8 32 --duration 10 [--batch 1]
+# Chaque client garde une connexion keep-alive et envoie des commandes en boucle ;
+# rapporte les latences p50 / p99 et le débit (requêtes et commandes par seconde).
+
+
+def make_payloads(n, batch, seed=0):
+    df = make_scoring_orders(n * batch, max(1, n * batch // 2), seed=seed)
+    df["date de creation"] = df["date de creation"].dt.strftime("%Y-%m-%dT%H:%M:%S")
+    records = json.loads(df.astype(object).to_json(orient="records", force_ascii=False))
+    if batch == 1:
+        return [json.dumps(r).encode("utf-8") for r in records]
+    return [json.dumps(records[i:i + batch]).encode("utf-8") for i in range(0, len(records), batch)]
+
+
+async def client(host, port, path, payloads, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            body = payloads[i % len(payloads)]
+            i += 1
+            request = (
+                f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not status.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"Réponse inattendue : {status!r}")
+    finally:
+        writer.close()
+
+
+async def run(host, port, concurrency, duration, batch, payloads):
+    path = "/score" if batch == 1 else "/score/batch"
+    latencies = []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, path, payloads, deadline, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help="Commandes par requête (1 = /score)")
+    args = parser.parse_args()
+
+    payloads = make_payloads(2_000, args.batch)
+    print(f"🔥 Test de charge http://{args.host}:{args.port} ({args.batch} commande(s) par requête, {args.duration:.0f}s)")
+    for concurrency in args.concurrency:
+        latencies, elapsed = asyncio.run(run(args.host, args.port, concurrency, args.duration, args.batch, payloads))
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        rps = len(latencies) / elapsed
+        print(f"   {concurrency:>4} clients : p50 {p50:6.2f} ms, p99 {p99:6.2f} ms, "
+              f"{rps:8,.0f} requêtes/s, {rps * args.batch:9,.0f} commandes/s")
+
+
+if __name__ == "__main__":
+    main()
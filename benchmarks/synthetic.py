@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# Générateur de commandes synthétiques (même schéma que data.xlsx)
+# =========================
+
+ETATS_COMMANDE = ["Confirmée", "Annulée", "En confirmation"]
+ETATS_LIVRAISON = ["Livrée", "Retour", "En livraison", "Preparation Stock"]
+ETATS_STOCK = ["Expédiée", "En préparation", "Rupture"]
+SOCIETES = ["zr express", "yalidine", "maystro", "ecotrack"]
+SOURCES = ["Facebook", "Instagram", "TikTok"]
+SHIFTS = ["Matin", "Soir"]
+BOUTIQUES = ["Jovia", "CITYSTOREDZ", "Seleneva", "BestStore", "ModePlus",
+             "ShopExpress", "DzMarket", "Luxora", "Nova", "Kenza"]
+WILAYAS = ["Alger", "Oran", "Constantine", "Annaba", "Blida", "Batna", "Sétif",
+           "Tlemcen", "Béjaïa", "Skikda", "Tizi Ouzou", "Mostaganem", "Msila",
+           "Sidi Bel Abbès", "Tiaret", "Béchar", "Tamanrasset", "Ouargla",
+           "Ghardaïa", "Adrar", "Chlef"]
+COMMUNES = ["Centre", "Sud", "Nord", "Quartier A", "Hussein Dey", "El Harrach",
+            "Khemis Miliana", "Bab Ezzouar"]
+PRENOMS = ["Omar", "Karim", "Naima", "Samia", "Khaled", "Aicha", "Rachid", "Yasmine"]
+NOMS = ["CHERKAOUI", "HADDAD", "BENALI", "BELAID", "BOUZID", "RAHMANI", "MEZIANE"]
+
+
+def make_orders(n_rows, start="2024-01-01", days=540, seed=0):
+    rng = np.random.default_rng(seed)
+    created = (
+        pd.Timestamp(start)
+        + pd.to_timedelta(rng.integers(0, days * 86400, n_rows), unit="s")
+    )
+    etat_cmd = rng.choice(ETATS_COMMANDE, n_rows, p=[0.6, 0.3, 0.1])
+    confirmed = etat_cmd == "Confirmée"
+    etat_liv = np.where(confirmed, rng.choice(ETATS_LIVRAISON, n_rows, p=[0.6, 0.2, 0.15, 0.05]), None)
+    etat_stock = np.where(confirmed, rng.choice(ETATS_STOCK, n_rows, p=[0.8, 0.15, 0.05]), None)
+    qte = rng.integers(1, 6, n_rows)
+    prix = rng.integers(10, 80, n_rows) * 100
+    livraison = rng.integers(400, 1500, n_rows)
+
+    return pd.DataFrame({
+        "ID_Commande": np.char.add("CMD", np.char.zfill(np.arange(1, n_rows + 1).astype(str), 7)),
+        "Date_Creation": created.normalize(),
+        "Heure_Creation": created.strftime("%H:%M:%S"),
+        "Shift": np.where(created.hour < 12, SHIFTS[0], SHIFTS[1]),
+        "Nom_Client": rng.choice(NOMS, n_rows),
+        "Prenom_Client": rng.choice(PRENOMS, n_rows),
+        "Tel_Client": rng.integers(213500000000, 213799999999, n_rows),
+        "Wilaya": rng.choice(WILAYAS, n_rows),
+        "Commune": rng.choice(COMMUNES, n_rows),
+        "Boutique": rng.choice(BOUTIQUES, n_rows),
+        "Etat_Commande": etat_cmd,
+        "Confirmateur": rng.choice(PRENOMS, n_rows),
+        "Agent_Expedition": np.where(confirmed, rng.choice(PRENOMS, n_rows), None),
+        "Etat_Stock": etat_stock,
+        "Etat_Livraison": etat_liv,
+        "Societe_Livraison": rng.choice(SOCIETES, n_rows),
+        "Qte": qte,
+        "Prix_Articles": prix,
+        "Prix_Livraison": livraison,
+        "Remise": rng.choice([0, 500, 1000], n_rows),
+        "Montant_Total": qte * prix + livraison,
+        "SKU": np.char.add("SKU-", rng.integers(1000, 9999, n_rows).astype(str)),
+        "Date_Confirmation": created.normalize() + pd.to_timedelta(confirmed.astype(int), unit="D"),
+        "Date_Livraison": created.normalize() + pd.to_timedelta(rng.integers(2, 8, n_rows), unit="D"),
+        "Source": rng.choice(SOURCES, n_rows),
+        "Fausse_Commande": (rng.random(n_rows) < 0.08).astype(int),
+    })
+
+
+def make_scoring_orders(n_rows, n_customers, start="2025-01-01", days=90, seed=0):
+    # Commandes au format du fichier à scorer (predire.xlsx), n_customers clients distincts
+    rng = np.random.default_rng(seed)
+    client = rng.integers(0, n_customers, n_rows)
+    # Catégories construites une fois par client (codes + dictionnaire, pas de chaîne par commande)
+    ips = [f"10.{c >> 16 & 255}.{c >> 8 & 255}.{c & 255}" for c in range(n_customers)]
+    noms = [f"client {c}" for c in range(n_customers)]
+    skus = [f"SKU-{i:04d}" for i in range(500)]
+
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories)
+
+    return pd.DataFrame({
+        "@ Ip du client": categorical(client, ips),
+        "date de creation": pd.Timestamp(start) + pd.to_timedelta(rng.integers(0, days * 86400, n_rows), unit="s"),
+        "nom prenom": categorical(client, noms),
+        "numero de telephone": 500_000_000 + client,
+        "Qte": rng.integers(1, 6, n_rows),
+        "Wilaya": categorical(rng.integers(0, len(WILAYAS), n_rows), WILAYAS),
+        "Commune": categorical(rng.integers(0, len(COMMUNES), n_rows), COMMUNES),
+        "SKU d'article": categorical(rng.integers(0, len(skus), n_rows), skus),
+        "Boutique": categorical(rng.integers(0, len(BOUTIQUES), n_rows), BOUTIQUES),
+        "montant total": rng.uniform(1_000, 150_000, n_rows).round(2),
+    })
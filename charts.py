@@ -0,0 +1,40 @@
+import pandas as pd
+
+# =========================
+# Décimation des graphiques côté serveur
+# =========================
+# Les figures ne reçoivent que des tables agrégées (modalité -> nombre) et
+# les colonnes à forte cardinalité sont limitées à N modalités + "Autres" :
+# la taille du JSON envoyé au navigateur ne dépend plus du volume de données.
+
+OTHER_LABEL = "Autres"
+DEFAULT_TOP_N = 8
+
+# Nombre maximal de parts par camembert, selon la colonne
+TOP_N_BY_COLUMN = {
+    "Boutique": 8,
+    "Wilaya": 10,
+    "Commune": 10,
+    "Confirmateur": 8,
+    "Agent_Expedition": 8,
+}
+
+
+def top_n(counts, n=DEFAULT_TOP_N, other_label=OTHER_LABEL):
+    # Garde les n plus grandes modalités et regroupe le reste dans "Autres"
+    counts = counts.sort_values(ascending=False)
+    if len(counts) <= n:
+        return counts
+    head = counts.iloc[:n]
+    rest = counts.iloc[n:].sum()
+    head.index = head.index.astype(str)
+    return pd.concat([head, pd.Series([rest], index=[other_label])])
+
+
+def decimate(counts, col_name):
+    return top_n(counts, TOP_N_BY_COLUMN.get(col_name, DEFAULT_TOP_N))
+
+
+def payload_size(fig):
+    # Taille (octets) du JSON de la figure tel qu'envoyé au navigateur
+    return len(fig.to_json().encode("utf-8"))
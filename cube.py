@@ -0,0 +1,132 @@
+import pandas as pd
+from date_index import date_bounds
+
+# =========================
+# Cube d'agrégats pour les dashboards Confirmation et Livraison
+# =========================
+# Le cube compte les commandes par jour x dimensions. Il est construit une fois
+# par version des données ; KPIs, camemberts, barres et carte sont des roll-ups
+# de ce cube. Seules les vues pré-agrégées (jour x 1-2 dimensions) utilisées par
+# les pages sont matérialisées, directement depuis les commandes : leur taille
+# est bornée par le nombre de jours et de modalités. Le niveau jour x toutes les
+# dimensions n'est pas gardé (presque une ligne par commande).
+
+DATE_COL = "Date_Creation"
+COUNT_COL = "n"
+
+CUBE_DIMENSIONS = [
+    "Etat_Commande",
+    "Etat_Livraison",
+    "Etat_Stock",
+    "Source",
+    "Boutique",
+    "Societe_Livraison",
+    "Wilaya",
+    "Shift",
+    "Fausse_Commande",
+]
+
+# Combinaisons de dimensions utilisées par les pages (en plus du jour)
+CUBE_VIEWS = [
+    ("Etat_Commande",),
+    ("Boutique",),
+    ("Source",),
+    ("Etat_Commande", "Shift"),
+    ("Fausse_Commande", "Source"),
+    ("Etat_Livraison",),
+    ("Etat_Stock",),
+    ("Etat_Livraison", "Societe_Livraison"),
+    ("Etat_Livraison", "Wilaya"),
+]
+
+
+class OrderCube:
+    def __init__(self, views, columns):
+        self.views = views
+        self.columns = columns
+
+    def __getitem__(self, col):
+        # Colonne lue dans la plus petite vue qui la contient (ex : cube["Mois"])
+        return self.view_for({col})[col]
+
+    def view_for(self, columns):
+        # Plus petite vue matérialisée contenant toutes les colonnes demandées
+        best = None
+        for dims, view in self.views.items():
+            if columns <= dims and (best is None or len(view) < len(best)):
+                best = view
+        if best is None:
+            raise KeyError(f"Aucune vue du cube pour {sorted(columns)} : l'ajouter à CUBE_VIEWS")
+        return best
+
+
+def _aggregate(frame, keys, weights=None):
+    grouped = frame.groupby(keys, observed=True, dropna=False, sort=False)
+    if weights is None:
+        counts = grouped.size()
+    else:
+        counts = grouped[weights].sum()
+    return counts.rename(COUNT_COL).reset_index()
+
+
+def _add_calendar(cube):
+    # Vues triées par jour : les filtres de période se font par searchsorted
+    cube = cube.sort_values("Jour", kind="stable", na_position="last", ignore_index=True)
+    cube["Annee"] = cube["Jour"].dt.year
+    cube["Num_Mois"] = cube["Jour"].dt.month
+    cube["Num_Jour"] = cube["Jour"].dt.day
+    return cube
+
+
+def build_cube(df):
+    dims = [c for c in CUBE_DIMENSIONS if c in df.columns]
+    has_date = DATE_COL in df.columns
+    day = [df[DATE_COL].dt.normalize().rename("Jour")] if has_date else []
+
+    views = {}
+    for view_dims in CUBE_VIEWS:
+        if not all(d in dims for d in view_dims):
+            continue
+        view = _aggregate(df, day + list(view_dims))
+        if has_date:
+            view = _add_calendar(view)
+        views[frozenset(view.columns) - {COUNT_COL}] = view
+    if not views:
+        # Aucune dimension des pages : total par jour seulement
+        view = _aggregate(df, day) if has_date else pd.DataFrame({COUNT_COL: [len(df)]})
+        if has_date:
+            view = _add_calendar(view)
+        views[frozenset(view.columns) - {COUNT_COL}] = view
+
+    columns = []
+    for view in views.values():
+        columns += [c for c in view.columns if c not in columns]
+    return OrderCube(views, pd.Index(columns))
+
+
+def select(cube, columns=(), where=None, start=None, end=None):
+    # Plage de jours inclusive (tranche par searchsorted) + égalités sur les dimensions
+    needed = set(columns) | set(where or ())
+    if start is not None or end is not None:
+        needed.add("Jour")
+    if not needed <= set(cube.columns):
+        return pd.DataFrame(columns=list(needed) + [COUNT_COL])
+    part = cube.view_for(needed)
+
+    if start is not None or end is not None:
+        i, j = date_bounds(part["Jour"].to_numpy(), start, end)
+        part = part.iloc[i:j]
+    if where:
+        mask = pd.Series(True, index=part.index)
+        for col, value in where.items():
+            mask &= part[col] == value
+        part = part[mask]
+    return part
+
+
+def rollup(cube, by, where=None, start=None, end=None, dropna=True):
+    # Somme des comptes sur les dimensions `by` (str ou liste)
+    by_list = [by] if isinstance(by, str) else list(by)
+    part = select(cube, by_list, where, start, end)
+    counts = part.groupby(by_list, observed=True, dropna=dropna, sort=False)[COUNT_COL].sum()
+    return counts[counts > 0]
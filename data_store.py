@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import shutil
+import hashlib
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# =========================
+# Stockage colonnaire des commandes (Parquet partitionné par mois)
+# =========================
+# Usage : python data_store.py [data.xlsx] [data_store]
+# Convertit l'export Excel en un dataset Parquet partitionné par mois de
+# Date_Creation (Mois=AAAA-MM), lu ensuite par le dashboard à la place du classeur.
+
+DEFAULT_SOURCE = "data.xlsx"
+DEFAULT_STORE = "data_store"
+PARTITION_COL = "Mois"
+
+# Colonnes à faible cardinalité stockées en dictionnaire (catégories pandas)
+CATEGORICAL_COLUMNS = [
+    "Shift",
+    "Wilaya",
+    "Commune",
+    "Boutique",
+    "Etat_Commande",
+    "Confirmateur",
+    "Agent_Expedition",
+    "Etat_Stock",
+    "Etat_Livraison",
+    "Societe_Livraison",
+    "Source",
+]
+
+DATE_COLUMNS = ["Date_Creation", "Date_Confirmation", "Date_Livraison"]
+
+
+def apply_dtypes(df):
+    # Typage commun au store et au fallback Excel
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def store_exists(store_dir=DEFAULT_STORE):
+    return os.path.isdir(store_dir) and any(
+        name.startswith(PARTITION_COL + "=") for name in os.listdir(store_dir)
+    )
+
+
+def build_store(source=DEFAULT_SOURCE, store_dir=DEFAULT_STORE):
+    df = apply_dtypes(pd.read_excel(source))
+    write_store(df, store_dir)
+    return df
+
+
+def write_store(df, store_dir=DEFAULT_STORE):
+    if "Date_Creation" not in df.columns:
+        raise ValueError("Colonne 'Date_Creation' absente : partitionnement impossible.")
+
+    df = df.copy()
+    df[PARTITION_COL] = df["Date_Creation"].dt.strftime("%Y-%m").fillna("inconnu")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Écriture dans un dossier temporaire puis remplacement, pour ne jamais
+    # exposer un store à moitié écrit au dashboard
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    ds.write_dataset(
+        table,
+        tmp_dir,
+        format="parquet",
+        partitioning=[PARTITION_COL],
+        partitioning_flavor="hive",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+
+
+def read_store(store_dir=DEFAULT_STORE, columns=None):
+    # Fichiers Parquet lus en mémoire mappée : pas de copie noyau -> tampon utilisateur
+    table = pq.read_table(store_dir, columns=columns, memory_map=True, partitioning="hive")
+    if PARTITION_COL in table.column_names:
+        table = table.drop_columns([PARTITION_COL])
+    df = table.to_pandas(self_destruct=True, split_blocks=True)
+    return apply_dtypes(df)
+
+
+def file_sha1(path, block_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+# =========================
+# Chargeur à détection de changement (une instance par processus Streamlit)
+# =========================
+# Pas d'ajout incrémental : toute modification (classeur ou fichiers du store)
+# entraîne une relecture complète, car write_store réécrit toutes les partitions
+# et un classeur Excel modifié doit de toute façon être reparsé en entier.
+# Seul un classeur touché mais au contenu identique (même SHA-1) est ignoré.
+class OrderStore:
+    def __init__(self, source=DEFAULT_SOURCE, store_dir=DEFAULT_STORE):
+        self.source = source
+        self.store_dir = store_dir
+        self.df = None
+        self.version = 0
+        self.fingerprint = None
+        self.content_hash = None
+        self.last_refresh = None
+        self.last_refresh_seconds = 0.0
+        self._lock = threading.RLock()
+
+    def _store_files(self):
+        files = {}
+        for root, _, names in os.walk(self.store_dir):
+            for name in names:
+                if name.endswith(".parquet"):
+                    path = os.path.join(root, name)
+                    st = os.stat(path)
+                    files[path] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def _source_stat(self):
+        if not os.path.exists(self.source):
+            return None
+        st = os.stat(self.source)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _current_fingerprint(self):
+        # Le classeur source fait partie de l'empreinte même quand le store existe :
+        # une modification de data.xlsx doit atteindre le dashboard
+        source = self._source_stat()
+        if store_exists(self.store_dir):
+            files = self._store_files()
+            if not self._store_is_stale(source, files):
+                return ("store", source, files)
+        return ("excel", source)
+
+    def _store_is_stale(self, source, files):
+        # Classeur modifié après la dernière écriture du store (python data_store.py).
+        # Le dashboard ne réécrit jamais le store (plusieurs processus Streamlit
+        # se disputeraient data_store.tmp) : il relit le classeur en attendant
+        # la prochaine reconstruction.
+        return source is not None and bool(files) and source[0] > max(mtime for mtime, _ in files.values())
+
+    def refresh(self):
+        # Appel à chaque rerun : un simple stat() tant que la source n'a pas changé
+        with self._lock:
+            fingerprint = self._current_fingerprint()
+            if fingerprint == self.fingerprint:
+                return self.df
+
+            start = time.perf_counter()
+            mode = fingerprint[0]
+            updated = None
+            if self.df is not None and mode == "excel" and self.fingerprint[0] == mode:
+                updated = self._refresh_excel()
+
+            if updated is None:
+                updated = self._load_full(mode)
+
+            if updated is not self.df:
+                self.df = updated
+                self.version += 1
+            self.fingerprint = fingerprint
+            self.last_refresh_seconds = time.perf_counter() - start
+            return self.df
+
+    def snapshot(self):
+        # (DataFrame, version) cohérents entre eux, même si une autre session recharge
+        with self._lock:
+            return self.refresh(), self.version
+
+    def _load_full(self, mode):
+        self.last_refresh = "complet"
+        if mode == "store":
+            return read_store(self.store_dir)
+        raw = pd.read_excel(self.source)
+        self.content_hash = file_sha1(self.source)
+        return apply_dtypes(raw)
+
+    def _refresh_excel(self):
+        # mtime modifié mais contenu identique (copie, touch) -> rien à faire ;
+        # sinon None : relecture complète
+        if file_sha1(self.source) == self.content_hash:
+            self.last_refresh = "inchangé"
+            return self.df
+        return None
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SOURCE
+    store_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE
+
+    if not os.path.exists(source):
+        print(f"❌ Erreur : fichier source introuvable : {source}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    df = build_store(source, store_dir)
+    print(f"✅ {len(df)} commandes écrites dans {store_dir}/ en {time.perf_counter() - start:.2f}s")
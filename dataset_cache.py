@@ -0,0 +1,106 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+import lightgbm as lgb
+from features import load_pipeline, save_pipeline
+from ingest import content_hash
+from out_of_core import FeatureFile
+from tuning import balanced_weights
+
+# =========================
+# Cache des Datasets LightGBM d'entraînement (prediction.py)
+# =========================
+# Construire les Datasets (lecture, features, split, calcul des bins) coûte plus
+# cher que de les relire : ils sont sauvegardés au format binaire de LightGBM
+# (save_binary) dans .dataset_cache/<clé>/, avec le pipeline ajusté et le jeu de
+# test. Clé = contenu des fichiers sources + version et options du pipeline +
+# paramètres des Datasets + version de LightGBM : si rien n'a changé, un
+# réentraînement (ou une recherche --tune) repart directement des bins.
+# Seules les MAX_ENTRIES entrées les plus récentes sont gardées.
+
+CACHE_DIR = ".dataset_cache"
+# À incrémenter si la construction des Datasets change (split, poids...)
+CACHE_VERSION = 1
+MAX_ENTRIES = 3
+
+# feature_pre_filter=False : min_child_samples peut varier ensuite (essais de --tune)
+DATASET_PARAMS = {"feature_pre_filter": False, "verbosity": -1}
+
+
+def make_datasets(X_train, y_train, X_val, y_val, feature_names, construct=True):
+    # Entraînement pondéré comme class_weight="balanced" ; validation non pondérée
+    # (même AUC que l'eval_set de LGBMClassifier.fit).
+    # construct=False : bins calculés par lgb.train, qui a besoin des données brutes
+    # pour les scores de départ d'un init_model (--incremental)
+    train_set = lgb.Dataset(X_train, y_train, weight=balanced_weights(y_train), feature_name=feature_names,
+                            params=DATASET_PARAMS)
+    valid_set = lgb.Dataset(X_val, y_val, reference=train_set, params=DATASET_PARAMS)
+    if construct:
+        train_set.construct()
+        valid_set.construct()
+    return train_set, valid_set
+
+
+def cache_key(sources, pipeline, mode="memory"):
+    # sources : fichiers dont le contenu détermine les données (dataset, historique)
+    parts = [
+        CACHE_VERSION, lgb.__version__, DATASET_PARAMS, mode, pipeline.config(),
+        [content_hash(path) for path in sources],
+    ]
+    return hashlib.blake2b(json.dumps(parts, sort_keys=True).encode(), digest_size=12).hexdigest()
+
+
+def load_datasets(key, root=CACHE_DIR):
+    # (train_set, valid_set, test, y_test, pipeline) ou None ; test : FeatureFile
+    folder = os.path.join(root, key)
+    if not os.path.isdir(folder):
+        return None
+    pipeline = load_pipeline(os.path.join(folder, "pipeline.joblib"))
+    train_set = lgb.Dataset(os.path.join(folder, "train.bin"), params=DATASET_PARAMS)
+    valid_set = lgb.Dataset(os.path.join(folder, "val.bin"), reference=train_set, params=DATASET_PARAMS)
+    train_set.construct()
+    valid_set.construct()
+    test = FeatureFile(os.path.join(folder, "test.f32"), len(pipeline.feature_names))
+    y_test = np.load(os.path.join(folder, "test_labels.npy"))
+    # Entrée la plus récemment utilisée : dernière à être supprimée
+    os.utime(folder)
+    return train_set, valid_set, test, y_test, pipeline
+
+
+def save_datasets(key, train_set, valid_set, X_test, y_test, pipeline, root=CACHE_DIR):
+    # X_test : matrice en mémoire ou FeatureFile (copiée)
+    folder = os.path.join(root, key)
+    tmp = folder + ".tmp"
+    try:
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        train_set.save_binary(os.path.join(tmp, "train.bin"))
+        valid_set.save_binary(os.path.join(tmp, "val.bin"))
+        if isinstance(X_test, FeatureFile):
+            shutil.copyfile(X_test.path, os.path.join(tmp, "test.f32"))
+        else:
+            np.ascontiguousarray(X_test, dtype=np.float32).tofile(os.path.join(tmp, "test.f32"))
+        np.save(os.path.join(tmp, "test_labels.npy"), np.asarray(y_test))
+        save_pipeline(pipeline, os.path.join(tmp, "pipeline.joblib"))
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(tmp, folder)
+        _prune(root)
+    except OSError:
+        # Disque plein ou dossier en lecture seule : pas de cache
+        shutil.rmtree(tmp, ignore_errors=True)
+        return None
+    return folder
+
+
+def _prune(root):
+    entries = [os.path.join(root, name) for name in os.listdir(root) if not name.endswith(".tmp")]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for folder in entries[MAX_ENTRIES:]:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def cache_size(key, root=CACHE_DIR):
+    folder = os.path.join(root, key)
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
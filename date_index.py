@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# Index de plages de dates (tri unique + searchsorted)
+# =========================
+# Les vues du cube sont triées une seule fois par jour (cube.py) ;
+# un filtre de période devient deux recherches dichotomiques O(log n) suivies
+# d'un iloc[i:j] (tranche sans copie), au lieu de deux comparaisons sur toute
+# la colonne à chaque interaction avec les sélecteurs de dates.
+
+
+def _as_datetime64(values, value):
+    return pd.Timestamp(value).to_datetime64().astype(values.dtype)
+
+
+def date_bounds(values, start=None, end=None):
+    # values : tableau datetime64 trié. Bornes inclusives au jour : la fin
+    # englobe toute la journée `end`. NumPy ordonne NaT après toute date, donc
+    # les NaT placés en fin par le tri des vues ne sont jamais inclus.
+    values = np.asarray(values)
+    i, j = 0, len(values)
+    if start is not None:
+        i = int(values.searchsorted(_as_datetime64(values, start), side="left"))
+    if end is not None:
+        next_day = pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+        j = int(values.searchsorted(_as_datetime64(values, next_day), side="left"))
+    elif len(values) and np.isnat(values[-1]):
+        j = int(values.searchsorted(np.datetime64("NaT"), side="left"))
+    return i, max(i, j)
+
+
+def month_range(label):
+    # "AAAA-MM" -> (premier jour, dernier jour) du mois
+    start = pd.Timestamp(label + "-01")
+    return start, start + pd.offsets.MonthEnd(0)
+
+
+def year_range(year):
+    year = int(year)
+    return pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year, month=12, day=31)
+
+
+def year_labels(years):
+    # Années présentes (entiers), sans la valeur manquante des dates NaT
+    return [int(y) for y in np.unique(years.dropna().to_numpy())]
+
+
+def month_labels(dates):
+    # Mois présents, au format "AAAA-MM", calculés sur les valeurs distinctes
+    months = np.unique(dates.dropna().to_numpy().astype("datetime64[M]"))
+    return [str(m) for m in months]
@@ -0,0 +1,81 @@
+import io
+import openpyxl
+import pyarrow as pa
+import pyarrow.parquet as pq
+from ingest import file_format
+
+# =========================
+# Export des résultats (CSV, Parquet, Excel)
+# =========================
+# ChunkWriter écrit un DataFrame bloc par bloc, vers un fichier (score.py) ou
+# vers un buffer en mémoire (téléchargement de la page Prédiction) :
+#   - CSV : blocs ajoutés les uns après les autres ;
+#   - Parquet : un row group par bloc (pyarrow.ParquetWriter) ;
+#   - Excel : openpyxl write_only, lignes écrites au fil de l'eau sans objets
+#     cellule (to_excel construit toute la feuille en mémoire avant d'écrire).
+# Rien n'est écrit sur un chemin partagé : deux sessions ne se marchent plus dessus.
+
+EXPORT_CHUNK = 50_000
+
+# Format -> (libellé, type MIME)
+EXPORT_FORMATS = {
+    "xlsx": ("Excel (.xlsx)", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV (.csv)", "text/csv"),
+    "parquet": ("Parquet (.parquet)", "application/vnd.apache.parquet"),
+}
+
+
+class ChunkWriter:
+    def __init__(self, target, fmt=None):
+        # target : chemin (format déduit de l'extension) ou buffer binaire (fmt obligatoire)
+        self.target = target
+        self.fmt = fmt or file_format(target)
+        self._is_path = isinstance(target, str)
+        self._parquet = None
+        self._workbook = None
+        self._sheet = None
+        self._started = False
+
+    def write(self, chunk):
+        if self.fmt == "csv":
+            if self._is_path:
+                chunk.to_csv(self.target, mode="a" if self._started else "w", header=not self._started, index=False)
+            else:
+                chunk.to_csv(self.target, header=not self._started, index=False)
+        elif self.fmt == "parquet":
+            if self._parquet is None:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                self._parquet = pq.ParquetWriter(self.target, table.schema)
+            else:
+                # Schéma du premier bloc imposé (types inférés bloc par bloc)
+                table = pa.Table.from_pandas(chunk, schema=self._parquet.schema, preserve_index=False)
+            self._parquet.write_table(table)
+        else:
+            if self._workbook is None:
+                # write_only : les lignes partent dans un fichier temporaire au fil de l'eau
+                self._workbook = openpyxl.Workbook(write_only=True)
+                self._sheet = self._workbook.create_sheet()
+                self._sheet.append(list(chunk.columns))
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False):
+                self._sheet.append(list(row))
+        self._started = True
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._workbook is not None:
+            self._workbook.save(self.target)
+
+
+def export_bytes(df, fmt, chunk_size=EXPORT_CHUNK):
+    # Contenu du fichier à télécharger, sérialisé en mémoire par blocs
+    buffer = io.BytesIO()
+    writer = ChunkWriter(buffer, fmt)
+    try:
+        # Au moins un bloc : l'en-tête est écrit même pour un résultat vide
+        for start in range(0, max(len(df), 1), chunk_size):
+            writer.write(df.iloc[start:start + chunk_size])
+    finally:
+        writer.close()
+    return buffer.getvalue()
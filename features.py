@@ -0,0 +1,270 @@
+import numpy as np
+import pandas as pd
+import joblib
+from velocity import VelocityStore, velocity_features
+from velocity import feature_names as velocity_feature_names
+
+# =========================
+# Pipeline de features (entraînement et inférence)
+# =========================
+# Ajusté une seule fois par prediction.py puis sauvegardé à côté du modèle
+# (feature_pipeline.joblib) : normalisation des noms de colonnes, champs
+# calendaires, encodage des catégories et alignement sur les features du
+# modèle, écrits en une passe dans une matrice NumPy float32 contiguë.
+# Entraînement et scoring passent par le même objet : aucune divergence possible.
+
+PIPELINE_PATH = "feature_pipeline.joblib"
+# À incrémenter dès que les features produites changent (colonnes, codes, valeurs
+# manquantes) : les Datasets LightGBM en cache (dataset_cache.py) sont alors reconstruits
+PIPELINE_VERSION = 1
+
+DATE_FEATURES = ["year", "month", "day", "dayofweek"]
+MISSING_NUM = -999
+MISSING_CAT = "NA"
+MISSING_DATE = -1
+
+# Encodage des colonnes catégorielles :
+#   ordinal   : un code par modalité vue à l'entraînement, -1 si inconnue
+#   hash      : hachage dans hash_buckets cases, sans vocabulaire (taille fixe)
+#   frequency : vocabulaire limité aux modalités vues au moins min_frequency fois
+#               (et aux max_categories plus fréquentes), le reste dans une case "autre"
+ENCODINGS = ["ordinal", "hash", "frequency"]
+DEFAULT_HASH_BUCKETS = 1 << 16
+DEFAULT_MIN_FREQUENCY = 2
+
+
+def normalize_columns(columns):
+    # "SKU d'article" -> "SKU_d_article"
+    return (
+        pd.Index(columns).str.strip()
+                         .str.replace(" ", "_")
+                         .str.replace("-", "_")
+                         .str.replace("'", "_")
+    )
+
+
+def find_date_column(columns):
+    date_cols = [c for c in columns if "date" in c.lower() or "creation" in c.lower()]
+    return date_cols[0] if date_cols else None
+
+
+class FeaturePipeline:
+    # Valeurs par défaut au niveau de la classe : les pipelines sauvegardés
+    # avant l'ajout des modes d'encodage se rechargent en mode "ordinal"
+    encoding = "ordinal"
+    hash_buckets = DEFAULT_HASH_BUCKETS
+    min_frequency = DEFAULT_MIN_FREQUENCY
+    max_categories = None
+    velocity = False
+    other_codes = None
+
+    def __init__(self, dtype=np.float32, encoding="ordinal", hash_buckets=DEFAULT_HASH_BUCKETS,
+                 min_frequency=DEFAULT_MIN_FREQUENCY, max_categories=None, velocity=False):
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Encodage inconnu : {encoding} (attendu : {', '.join(ENCODINGS)})")
+        self.dtype = np.dtype(dtype)
+        self.encoding = encoding
+        self.hash_buckets = hash_buckets
+        self.min_frequency = min_frequency
+        self.max_categories = max_categories
+        # Features de vélocité par client (velocity.py) ajoutées aux colonnes d'origine
+        self.velocity = velocity
+        self.date_col = None
+        self.cat_cols = []
+        self.categories = {}
+        # Code "autre" (encodage frequency) figé lors d'une extension du vocabulaire
+        self.other_codes = None
+        self.feature_names = []
+
+    def config(self):
+        # Version et options qui déterminent les features produites
+        return {
+            "version": PIPELINE_VERSION,
+            "dtype": self.dtype.name,
+            "encoding": self.encoding,
+            "hash_buckets": self.hash_buckets,
+            "min_frequency": self.min_frequency,
+            "max_categories": self.max_categories,
+            "velocity": self.velocity,
+        }
+
+    # -------- Ajustement --------
+    def fit(self, df):
+        return self.fit_chunks([df])
+
+    def fit_chunks(self, chunks):
+        # Ajustement en flux (entraînement --out-of-core) : colonnes et types pris
+        # sur le premier bloc, comptages des modalités cumulés sur tous les blocs
+        counts = {}
+        columns = None
+        for df in chunks:
+            df = df.rename(columns=dict(zip(df.columns, normalize_columns(df.columns))))
+            if columns is None:
+                self.date_col = find_date_column(df.columns)
+                columns = [c for c in df.columns if c != self.date_col]
+                # Catégorielles : toute colonne non numérique (object, str, category)
+                self.cat_cols = [c for c in columns if not pd.api.types.is_numeric_dtype(df[c])]
+            if self.encoding == "hash":
+                continue
+            for c in self.cat_cols:
+                chunk_counts = df[c].astype(object).fillna(MISSING_CAT).value_counts()
+                counts[c] = chunk_counts if c not in counts else counts[c].add(chunk_counts, fill_value=0)
+        if columns is None:
+            raise ValueError("aucune ligne à ajuster")
+
+        self.categories = {}
+        self.other_codes = None
+        if self.encoding == "ordinal":
+            # Vocabulaire trié, comme OrdinalEncoder : code = position dans la liste
+            self.categories = {c: np.sort(counts[c].index.to_numpy(object)) for c in self.cat_cols}
+        elif self.encoding == "frequency":
+            # Seules les modalités fréquentes ont un code, les autres vont dans "autre"
+            for c in self.cat_cols:
+                counts_c = counts[c].sort_values(ascending=False, kind="stable")
+                counts_c = counts_c[counts_c >= self.min_frequency]
+                if self.max_categories is not None:
+                    counts_c = counts_c.iloc[:self.max_categories]
+                self.categories[c] = np.sort(counts_c.index.to_numpy(object))
+        self.feature_names = columns + (DATE_FEATURES if self.date_col else [])
+        if self.velocity:
+            self.feature_names += velocity_feature_names()
+        return self
+
+    def extend(self, df):
+        # Apprentissage incrémental : ajoute les modalités nouvelles de df au
+        # vocabulaire sans changer aucun code existant (les arbres déjà entraînés
+        # gardent leur sens). Retourne {colonne: nombre de modalités ajoutées}.
+        if self.encoding == "hash":
+            return {}
+        df = df.rename(columns=dict(zip(df.columns, normalize_columns(df.columns))))
+        added = {}
+        for c in self.cat_cols:
+            if c not in df.columns:
+                continue
+            values = df[c].astype(object).fillna(MISSING_CAT)
+            if self.encoding == "frequency":
+                counts = values.value_counts()
+                candidates = counts[counts >= self.min_frequency].index
+            else:
+                candidates = pd.Index(values.unique())
+            new = candidates[self._lookup(c).get_indexer(candidates) < 0]
+            if not len(new):
+                continue
+            if self.encoding == "frequency":
+                # Le code "autre" reste celui de l'ajustement initial ; les nouvelles modalités passent après
+                self.other_codes = dict(self.other_codes or {})
+                self.other_codes.setdefault(c, len(self.categories[c]))
+            # Ajoutées en fin de vocabulaire : les codes existants (positions) ne bougent pas
+            self.categories[c] = np.concatenate([self.categories[c], np.sort(new.to_numpy(object))])
+            self.__dict__.get("_lookups", {}).pop(c, None)
+            added[c] = len(new)
+        return added
+
+    @classmethod
+    def from_legacy(cls, encoder, feature_names, dtype=np.float32):
+        # Reconstruit le pipeline d'un modèle entraîné avant features.py
+        # (OrdinalEncoder + noms de features du booster)
+        pipeline = cls(dtype)
+        pipeline.feature_names = list(feature_names)
+        if encoder is not None:
+            pipeline.cat_cols = list(encoder.feature_names_in_)
+            pipeline.categories = dict(zip(pipeline.cat_cols, encoder.categories_))
+        if any(f in pipeline.feature_names for f in DATE_FEATURES):
+            pipeline.date_col = "date_de_creation"
+        return pipeline
+
+    # -------- Transformation --------
+    def transform(self, df, velocity_store=None):
+        # velocity_store : VelocityStore en ligne (commandes reçues dans l'ordre
+        # chronologique) ; sans store, la vélocité est calculée sur le seul lot df
+        columns = dict(zip(normalize_columns(df.columns), df.columns))
+        out = np.empty((len(df), len(self.feature_names)), dtype=self.dtype)
+        velocity_names = self._velocity_names(columns)
+
+        dates = None
+        date_col = self.date_col if self.date_col in columns else find_date_column(columns)
+        if date_col is not None:
+            dates = pd.to_datetime(df[columns[date_col]], errors="coerce").dt
+
+        for j, name in enumerate(self.feature_names):
+            if name in DATE_FEATURES and dates is not None:
+                out[:, j] = getattr(dates, name).fillna(MISSING_DATE).to_numpy(self.dtype)
+            elif name in velocity_names:
+                continue
+            elif name not in columns:
+                out[:, j] = MISSING_NUM
+            elif name in self.cat_cols:
+                out[:, j] = self._encode(name, df[columns[name]].astype(object).fillna(MISSING_CAT))
+            else:
+                values = pd.to_numeric(df[columns[name]], errors="coerce")
+                out[:, j] = values.fillna(MISSING_NUM).to_numpy(self.dtype)
+
+        # Vélocité en dernier : une commande refusée par l'encodage n'entre pas dans le store
+        if velocity_names:
+            velocity = self._velocity(df, columns, velocity_store)
+            for j, name in enumerate(self.feature_names):
+                if name in velocity_names:
+                    out[:, j] = velocity[name].fillna(MISSING_NUM).to_numpy(self.dtype)
+        return out
+
+    def _velocity_names(self, columns):
+        # Colonnes de vélocité absentes de df (calculées ici), vide si inutiles
+        return {n for n in velocity_feature_names() if n not in columns} if self.velocity else set()
+
+    def _velocity(self, df, columns, velocity_store):
+        normalized = df.rename(columns={v: k for k, v in columns.items()})
+        if velocity_store is not None:
+            return velocity_store.update_frame(normalized)
+        return velocity_features(normalized, date_col=self.date_col)
+
+    def _lookup(self, name):
+        # Index par colonne catégorielle, construit une fois : sa table de hachage
+        # est réutilisée d'un appel à l'autre (essentiel pour le scoring ligne à ligne)
+        lookups = self.__dict__.setdefault("_lookups", {})
+        if name not in lookups:
+            lookups[name] = pd.Index(self.categories[name], dtype=object)
+        return lookups[name]
+
+    def __getstate__(self):
+        # Les index de recherche ne sont pas sauvegardés (reconstruits au besoin)
+        state = self.__dict__.copy()
+        state.pop("_lookups", None)
+        return state
+
+    def _encode(self, name, values):
+        if self.encoding == "hash":
+            # Hachage stable (clé fixe de pandas) : aucun vocabulaire à stocker
+            return pd.util.hash_array(values.to_numpy(object)) % np.uint64(self.hash_buckets)
+        codes = self._lookup(name).get_indexer(values)
+        if self.encoding == "frequency":
+            # Modalités rares ou inconnues -> code "autre" = taille du vocabulaire ajusté
+            other = (self.other_codes or {}).get(name)
+            if other is None:
+                return np.where(codes < 0, len(self.categories[name]), codes)
+            # Vocabulaire étendu : les modalités ajoutées sont décalées d'un cran après "autre"
+            codes = np.where(codes >= other, codes + 1, codes)
+            return np.where(codes < 0, other, codes)
+        # Valeurs inconnues -> -1 (équivalent de handle_unknown="use_encoded_value")
+        return codes
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def velocity_store(self, history=None):
+        # Store en ligne compatible avec ce pipeline (None sans vélocité) ;
+        # history : commandes passées rejouées d'abord, pour que les fenêtres
+        # ne partent pas vides (mêmes valeurs qu'hors ligne sur history + flux)
+        if not self.velocity:
+            return None
+        store = VelocityStore(date_col=self.date_col)
+        if history is not None and len(history):
+            self._velocity(history, dict(zip(normalize_columns(history.columns), history.columns)), store)
+        return store
+
+
+def save_pipeline(pipeline, path=PIPELINE_PATH):
+    joblib.dump(pipeline, path)
+
+
+def load_pipeline(path=PIPELINE_PATH, mmap_mode=None):
+    return joblib.load(path, mmap_mode=mmap_mode)
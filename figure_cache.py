@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+from charts import payload_size
+
+# =========================
+# Cache LRU des figures Plotly
+# =========================
+# Clé : (page, graphique, état des filtres, version des données). Une seule
+# instance par processus (st.cache_resource), partagée entre les sessions :
+# un rerun qui ne touche pas aux entrées d'un graphique réutilise sa figure.
+# Les figures mises en cache ne doivent plus être modifiées après construction.
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class FigureCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._data_version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def invalidate(self, data_version):
+        # Vide le cache quand les données changent de version
+        with self._lock:
+            if data_version != self._data_version:
+                self._entries.clear()
+                self._data_version = data_version
+
+    def get_or_build(self, key, build):
+        # Retourne (figure, taille du JSON en octets) ; figure None si rien à tracer
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        fig = build()
+        entry = (fig, payload_size(fig) if fig is not None else 0)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entrées": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "évictions": self.evictions,
+                "taux de hit": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,161 @@
+import os
+import json
+import hashlib
+import openpyxl
+import pandas as pd
+import pyarrow.parquet as pq
+from pandas.io.parsers import TextParser
+
+try:
+    import python_calamine  # noqa: F401  (lecteur Excel en Rust, facultatif)
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# =========================
+# Lecture des fichiers de commandes (Excel, CSV, Parquet)
+# =========================
+# Un seul point d'entrée, read_table(), pour l'entraînement (prediction.py), la
+# page Prédiction (via schema.py) et score.py :
+#   - CSV / Parquet : lus directement (chemin rapide, à privilégier pour les gros fichiers) ;
+#   - Excel : calamine si installé, sinon openpyxl en lecture seule, lignes lues
+#     en flux (values_only, sans objets cellule) puis typées par TextParser,
+#     exactement comme pd.read_excel ;
+#   - le résultat d'une lecture Excel est mis en cache au format Parquet à côté
+#     de la source (.ingest_cache/), sous une clé = hash du contenu + options de
+#     lecture : relire un classeur inchangé ne coûte plus qu'une lecture Parquet.
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".xlsx": "xlsx"}
+CACHE_DIR = ".ingest_cache"
+# À incrémenter si la lecture Excel change : les anciens caches sont ignorés
+CACHE_VERSION = 1
+HASH_BLOCK = 1 << 20
+
+
+def file_format(name):
+    ext = os.path.splitext(name)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Format non supporté : {ext} (attendu : {', '.join(FORMATS)})")
+    return FORMATS[ext]
+
+
+def content_hash(source):
+    # Empreinte du contenu (chemin ou fichier ouvert), lue par blocs
+    h = hashlib.blake2b(digest_size=16)
+    f = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        f.seek(0)
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    finally:
+        if f is not source:
+            f.close()
+        else:
+            f.seek(0)
+    return h.hexdigest()
+
+
+# =========================
+# Excel
+# =========================
+def iter_excel_rows(source):
+    # Lignes de la première feuille (tuples de valeurs), en-tête compris
+    wb = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def excel_chunks(source, chunk_size):
+    # DataFrames de chunk_size lignes au plus, lignes vides ignorées (score.py)
+    rows = iter_excel_rows(source)
+    header = next(rows, None)
+    if header is None:
+        return
+    buffer = []
+    for row in rows:
+        if any(v is not None for v in row):
+            buffer.append(row)
+        if len(buffer) == chunk_size:
+            yield pd.DataFrame(buffer, columns=header)
+            buffer = []
+    if buffer:
+        yield pd.DataFrame(buffer, columns=header)
+
+
+def iter_chunks(path, chunk_size, dtype=None):
+    # Fichier lu par blocs de chunk_size lignes (score.py, entraînement --out-of-core) ;
+    # dtype : types imposés à la lecture CSV (sinon inférés bloc par bloc)
+    fmt = file_format(path)
+    if fmt == "csv":
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+    elif fmt == "parquet":
+        for batch in pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # openpyxl en lecture seule : les lignes sont lues en flux, sans charger la feuille
+        yield from excel_chunks(path, chunk_size)
+
+
+def read_excel(source, usecols=None, dtype=None):
+    if EXCEL_ENGINE == "calamine":
+        return pd.read_excel(source, engine="calamine", usecols=usecols, dtype=dtype)
+    rows = list(iter_excel_rows(source))
+    # Lignes vides en fin de feuille (mise en forme) retirées, comme pd.read_excel
+    while rows and all(v is None for v in rows[-1]):
+        rows.pop()
+    if not rows:
+        return pd.DataFrame()
+    # Même inférence de types que pd.read_excel ("0550..." -> entier, dates, NaN)
+    return TextParser(rows, header=0, usecols=usecols, dtype=dtype).read()
+
+
+# =========================
+# Cache Parquet des classeurs
+# =========================
+def cache_path(path, usecols=None, dtype=None):
+    content = content_hash(path)
+    options = json.dumps([CACHE_VERSION, EXCEL_ENGINE, usecols, dtype], sort_keys=True, default=str)
+    key = hashlib.blake2b(options.encode(), digest_size=4).hexdigest()
+    folder = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    return os.path.join(folder, f"{os.path.basename(path)}.{content[:16]}.{key}.parquet")
+
+
+def _write_cache(df, path):
+    folder, name = os.path.split(path)
+    source, content = name.split(".")[:-3], name.split(".")[-3]
+    prefix = ".".join(source) + "."
+    try:
+        os.makedirs(folder, exist_ok=True)
+        # Caches d'une version précédente du même fichier supprimés
+        for old in os.listdir(folder):
+            if old.startswith(prefix) and old.split(".")[-3] != content:
+                os.remove(os.path.join(folder, old))
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    except (OSError, ValueError, TypeError):
+        # Dossier en lecture seule ou colonne non convertible (types mélangés) : pas de cache
+        pass
+
+
+def read_table(source, usecols=None, dtype=None, parse_dates=None, cache=True, fmt=None):
+    # source : chemin ou fichier ouvert (fmt déduit de son nom si absent).
+    # usecols / dtype : noms d'origine ; parse_dates : colonnes date d'un CSV.
+    fmt = fmt or file_format(getattr(source, "name", source))
+    if fmt == "csv":
+        return pd.read_csv(source, usecols=usecols, dtype=dtype, parse_dates=parse_dates)
+    if fmt == "parquet":
+        df = pd.read_parquet(source, columns=usecols)
+        return df.astype(dtype) if dtype else df
+
+    is_path = isinstance(source, (str, os.PathLike))
+    if not (cache and is_path):
+        return read_excel(source, usecols, dtype)
+    cached = cache_path(source, usecols, dtype)
+    if os.path.exists(cached):
+        return pd.read_parquet(cached)
+    df = read_excel(source, usecols, dtype)
+    _write_cache(df, cached)
+    return df
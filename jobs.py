@@ -0,0 +1,153 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================
+# File de travaux en arrière-plan (prédictions de la page Prédiction)
+# =========================
+# Une instance par processus (st.cache_resource), partagée entre les sessions :
+# un travail soumis continue de tourner quand le script Streamlit est relancé
+# (clic, widget) et son résultat se récupère par son identifiant. Pool de
+# threads : LightGBM, NumPy et pyarrow libèrent le GIL pendant les calculs.
+# La tâche reçoit le Job en premier argument pour publier sa progression
+# (job.report) et s'arrêter proprement si elle est annulée (job.check).
+
+DEFAULT_WORKERS = 2
+# Travaux terminés conservés (résultats compris) avant d'être oubliés, du plus ancien au plus récent
+DEFAULT_MAX_FINISHED = 32
+
+PENDING = "en attente"
+RUNNING = "en cours"
+DONE = "terminé"
+FAILED = "échoué"
+CANCELLED = "annulé"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._future = None
+
+    # -------- Côté tâche --------
+    def report(self, progress, message=""):
+        self.check()
+        self.progress = min(max(float(progress), 0.0), 1.0)
+        self.message = message
+
+    def check(self):
+        # Point d'annulation coopératif, à appeler entre deux étapes
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    # -------- Côté interface --------
+    @property
+    def finished(self):
+        return self.status in FINISHED
+
+    @property
+    def wait_seconds(self):
+        # Attente dans la file (jusqu'à maintenant si le travail n'a pas démarré)
+        end = self.started_at or self.finished_at or time.time()
+        return end - self.submitted_at
+
+    @property
+    def run_seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def as_row(self):
+        return {
+            "Travail": self.id,
+            "Libellé": self.label,
+            "Statut": self.status,
+            "Progression": f"{self.progress:.0%}",
+            "Attente (s)": round(self.wait_seconds, 2),
+            "Exécution (s)": round(self.run_seconds, 2),
+        }
+
+
+class JobQueue:
+    def __init__(self, max_workers=DEFAULT_WORKERS, max_finished=DEFAULT_MAX_FINISHED):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, label="", **kwargs):
+        # Lance fn(job, *args, **kwargs) dès qu'un worker est libre ; retourne l'identifiant
+        job = Job(label)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job._future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        if job._cancel.is_set():
+            job.status, job.finished_at = CANCELLED, time.time()
+            return
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        # En attente : retiré de la file ; en cours : arrêté au prochain job.check()
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return False
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            job.status, job.finished_at = CANCELLED, time.time()
+        return True
+
+    def jobs(self, ids=None):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return jobs if ids is None else [j for j in jobs if j.id in ids]
+
+    def stats(self):
+        jobs = self.jobs()
+        return {status: sum(j.status == status for j in jobs) for status in (PENDING, RUNNING) + FINISHED}
+
+    def _prune(self):
+        # Appelé sous verrou : oublie les travaux terminés les plus anciens
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for job in self.jobs():
+            job._cancel.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
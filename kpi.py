@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+# =========================
+# Moteur de KPIs (Confirmation / Livraison)
+# =========================
+# Tous les comptes d'états sont obtenus en une passe par colonne
+# (np.bincount sur les codes catégoriels), sans masque booléen ni
+# DataFrame filtré intermédiaire. Fonctionne sur les commandes brutes ou
+# sur le cube d'agrégats (comptes pondérés par la colonne "n").
+
+KPI_COLUMNS = ["Etat_Commande", "Etat_Livraison", "Etat_Stock", "Fausse_Commande"]
+
+
+BLOCK_SIZE = 1 << 16
+
+
+def _bincount_blocks(codes, minlength, weights=None, offset=0):
+    # np.bincount convertit ses entrées en intp (8 octets/ligne) : on le fait
+    # par blocs pour garder une allocation bornée, quel que soit le nombre de lignes
+    counts = np.zeros(minlength, dtype=np.float64 if weights is not None else np.int64)
+    for start in range(0, len(codes), BLOCK_SIZE):
+        block = np.add(codes[start:start + BLOCK_SIZE], offset, dtype=np.intp)
+        w = None if weights is None else weights[start:start + BLOCK_SIZE]
+        counts += np.bincount(block, weights=w, minlength=minlength)
+    return counts.astype(np.int64)
+
+
+def state_counts(values, weights=None):
+    # Comptes par modalité d'une colonne (NaN exclus)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Codes décalés de 1 : le code -1 (NaN) tombe dans la case 0, ignorée
+        categories = values.cat.categories
+        codes = values.cat.codes.to_numpy()
+        counts = _bincount_blocks(codes, len(categories) + 1, weights, offset=1)
+        return dict(zip(categories, counts[1:].tolist()))
+    if pd.api.types.is_integer_dtype(values.dtype) and len(values) > 0:
+        arr = values.to_numpy()
+        low, high = arr.min(), arr.max()
+        if low >= 0 and high < 1024:
+            counts = _bincount_blocks(arr, int(high) + 1, weights)
+            return {k: int(c) for k, c in enumerate(counts) if c}
+    if weights is None:
+        return values.value_counts(dropna=True).to_dict()
+    return pd.Series(weights, index=values.to_numpy()).groupby(level=0).sum().to_dict()
+
+
+def _ratio(num, den):
+    return num / den if den > 0 else 0
+
+
+def compute_kpis(data):
+    # data : DataFrame de commandes ou OrderCube (cube.py)
+    if hasattr(data, "view_for"):
+        def counts_of(col):
+            view = data.view_for({col})
+            return state_counts(view[col], view["n"].to_numpy())
+        total = int(data.view_for(set())["n"].sum())
+    else:
+        def counts_of(col):
+            return state_counts(data[col])
+        total = len(data)
+
+    counts = {col: counts_of(col) if col in data.columns else {} for col in KPI_COLUMNS}
+    commande = counts["Etat_Commande"]
+    livraison = counts["Etat_Livraison"]
+
+    kpis = {
+        "total": total,
+        "confirmees": int(commande.get("Confirmée", 0)),
+        "annulees": int(commande.get("Annulée", 0)),
+        "en_confirmation": int(commande.get("En confirmation", 0)),
+        "livrees": int(livraison.get("Livrée", 0)),
+        "retours": int(livraison.get("Retour", 0)),
+        "en_livraison": int(livraison.get("En livraison", 0)),
+        "preparation_stock": int(livraison.get("Preparation Stock", 0)),
+        "expediees": int(counts["Etat_Stock"].get("Expédiée", 0)),
+        "fausses": int(counts["Fausse_Commande"].get(1, 0)),
+    }
+    kpis["taux_confirmation"] = _ratio(kpis["confirmees"], kpis["confirmees"] + kpis["annulees"])
+    kpis["taux_livraison"] = _ratio(kpis["livrees"], kpis["livrees"] + kpis["retours"])
+    kpis["taux_retour"] = _ratio(kpis["retours"], kpis["livrees"] + kpis["retours"])
+    kpis["taux_fausses"] = _ratio(kpis["fausses"], total)
+    return kpis
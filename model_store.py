@@ -0,0 +1,57 @@
+import os
+import time
+import threading
+from features import PIPELINE_PATH
+from scoring import ENCODER_PATH, MODEL_PATH, load_artifacts
+
+# =========================
+# Cache du modèle et du pipeline de features (une instance par processus)
+# =========================
+# Chargés une seule fois puis partagés entre toutes les sessions Streamlit
+# (st.cache_resource) ; rechargés quand le modèle et son pipeline ont tous deux
+# changé (empreinte mtime/taille, un simple stat() par prédiction) : prediction.py
+# les remplace l'un après l'autre, l'ancienne paire est servie entre les deux.
+# mmap_mode="r" : les tableaux NumPy des artefacts sont mappés en mémoire
+# (pages partagées entre workers) au lieu d'être copiés dans chaque processus.
+# Les objets partagés ne doivent jamais être modifiés.
+
+
+class ModelStore:
+    def __init__(self, model_path=MODEL_PATH, pipeline_path=PIPELINE_PATH,
+                 encoder_path=ENCODER_PATH, mmap_mode=None):
+        self.paths = (model_path, pipeline_path, encoder_path)
+        self.mmap_mode = mmap_mode
+        self.model = None
+        self.pipeline = None
+        self.version = 0
+        self.fingerprint = None
+        self.last_load_seconds = 0.0
+        self._lock = threading.RLock()
+
+    def _current_fingerprint(self):
+        fingerprint = []
+        for path in self.paths:
+            if os.path.exists(path):
+                st = os.stat(path)
+                fingerprint.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(fingerprint)
+
+    def _pair_changed(self, fingerprint):
+        # Modèle et pipeline (s'il existe) tous deux modifiés depuis le dernier chargement
+        if self.model is None:
+            return True
+        old = {path: meta for path, *meta in self.fingerprint}
+        new = {path: meta for path, *meta in fingerprint}
+        return all(new.get(path) != old.get(path) for path in self.paths[:2] if path in old or path in new)
+
+    def get(self):
+        # (modèle, pipeline) à jour ; recharge seulement si les fichiers ont changé
+        with self._lock:
+            fingerprint = self._current_fingerprint()
+            if fingerprint != self.fingerprint and self._pair_changed(fingerprint):
+                start = time.perf_counter()
+                self.model, self.pipeline = load_artifacts(*self.paths, mmap_mode=self.mmap_mode)
+                self.last_load_seconds = time.perf_counter() - start
+                self.fingerprint = fingerprint
+                self.version += 1
+            return self.model, self.pipeline
@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import lightgbm as lgb
+from sklearn.model_selection import train_test_split
+from features import normalize_columns
+from ingest import iter_chunks
+
+# =========================
+# Entraînement hors mémoire (prediction.py --out-of-core)
+# =========================
+# Le fichier d'entraînement n'est jamais chargé en entier : deux passes par blocs.
+#   1) ajustement du pipeline (comptages des modalités), cible et nombre de lignes ;
+#   2) chaque bloc est transformé (float32) et ses lignes écrites dans trois
+#      fichiers bruts train / val / test, selon le split stratifié 70/15/15
+#      tiré sur la cible après la passe 1 (mêmes lignes que split_sets).
+# LightGBM construit ensuite ses Datasets depuis ces fichiers via lgb.Sequence :
+# échantillon pour les bornes des bins, puis lignes poussées par lots. En mémoire
+# ne restent que le Dataset binné (un octet par valeur ou moins), la cible et un bloc.
+# Les fichiers CSV sont typés bloc par bloc : privilégier le Parquet.
+# Pas de features de vélocité : elles supposent les commandes triées par date sur
+# tout le fichier, ce qu'une lecture par blocs ne garantit pas.
+
+DEFAULT_CHUNK_SIZE = 100_000
+SPLITS = ("train", "val", "test")
+
+
+class FeatureFile(lgb.Sequence):
+    # Matrice float32 (n_rows x n_features) stockée à plat sur disque, lue à la
+    # demande : rien n'est projeté en mémoire, contrairement à np.memmap
+    batch_size = 16_384
+
+    def __init__(self, path, n_features):
+        self.path = path
+        self.n_features = n_features
+        self.row_bytes = n_features * np.dtype(np.float32).itemsize
+        self.n_rows = os.path.getsize(path) // self.row_bytes
+        self._file = None
+
+    def __len__(self):
+        return self.n_rows
+
+    def _read(self, start, stop):
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        self._file.seek(start * self.row_bytes)
+        data = self._file.read((stop - start) * self.row_bytes)
+        return np.frombuffer(data, dtype=np.float32).reshape(-1, self.n_features)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, _ = idx.indices(self.n_rows)
+            return self._read(start, stop)
+        # Ligne isolée (échantillon des bornes de bins) : LightGBM l'attend en float64
+        return self._read(idx, idx + 1)[0].astype(np.float64)
+
+    def batches(self, batch_size=None):
+        batch_size = batch_size or self.batch_size
+        for start in range(0, self.n_rows, batch_size):
+            yield self._read(start, min(start + batch_size, self.n_rows))
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _chunks(path, chunk_size):
+    for chunk in iter_chunks(path, chunk_size):
+        chunk.columns = normalize_columns(chunk.columns)
+        yield chunk
+
+
+def write_features(path, target_col, pipeline, work_dir, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Passe 1 : pipeline ajusté et cible ; passe 2 : features écrites par split.
+    # Retourne ({split: FeatureFile}, {split: cible}).
+    if pipeline.velocity:
+        raise ValueError("features de vélocité non disponibles en lecture par blocs")
+    y_parts = []
+
+    def fit_chunks():
+        for chunk in _chunks(path, chunk_size):
+            y_parts.append(chunk[target_col].to_numpy(np.int8))
+            yield chunk.drop(columns=[target_col])
+
+    pipeline.fit_chunks(fit_chunks())
+    y = np.concatenate(y_parts)
+    del y_parts
+
+    # Split sur les positions : mêmes lignes que split_sets(X, y) en mémoire
+    rows = np.arange(len(y))
+    train, rest = train_test_split(rows, test_size=0.30, stratify=y, random_state=42)
+    val, test = train_test_split(rest, test_size=0.5, stratify=y[rest], random_state=42)
+    part = np.empty(len(y), dtype=np.int8)
+    for i, split_rows in enumerate((train, val, test)):
+        part[split_rows] = i
+
+    paths = {name: os.path.join(work_dir, f"{name}.f32") for name in SPLITS}
+    files = {name: open(p, "wb") for name, p in paths.items()}
+    try:
+        offset = 0
+        for chunk in _chunks(path, chunk_size):
+            X = pipeline.transform(chunk.drop(columns=[target_col]))
+            chunk_part = part[offset:offset + len(X)]
+            for i, name in enumerate(SPLITS):
+                X[chunk_part == i].tofile(files[name])
+            offset += len(X)
+    finally:
+        for f in files.values():
+            f.close()
+
+    n_features = len(pipeline.feature_names)
+    features = {name: FeatureFile(p, n_features) for name, p in paths.items()}
+    # Lignes de chaque split dans l'ordre du fichier, comme écrites ci-dessus
+    labels = {name: y[part == i] for i, name in enumerate(SPLITS)}
+    return features, labels
+
+
+def build_datasets(features, labels, feature_names, weight=None, params=None):
+    # Datasets LightGBM train / val construits par lots depuis les fichiers de features
+    params = {"verbosity": -1, **(params or {})}
+    train_set = lgb.Dataset([features["train"]], labels["train"], weight=weight,
+                            feature_name=feature_names, params=params)
+    valid_set = lgb.Dataset([features["val"]], labels["val"], reference=train_set, params=params)
+    train_set.construct()
+    valid_set.construct()
+    if weight is not None:
+        # Créée par lots depuis une référence pondérée, la validation hérite de poids
+        # nuls (AUC faussée, logloss NaN) ; set_weight ignore des poids tous à 1
+        valid_set.set_field("weight", np.ones(len(labels["val"]), dtype=np.float32))
+    return train_set, valid_set
+
+
+def predict_file(booster, feature_file, batch_size=None):
+    # Probabilités sur un fichier de features, lot par lot
+    return np.concatenate([booster.predict(X) for X in feature_file.batches(batch_size)])
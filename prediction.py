@@ -1,91 +1,42 @@
 import os
 import sys
-import pandas as pd
+import json
+import time
+import copy
+import argparse
+import tempfile
 import numpy as np
+import pandas as pd
 import lightgbm as lgb
+from datetime import datetime
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import (
     confusion_matrix, classification_report, roc_auc_score, f1_score, average_precision_score
 )
-from sklearn.preprocessing import OrdinalEncoder
 import joblib
-
-# --------- 1) Trouver le dataset d'entraînement ----------
-candidates = ["prediction.xlsx", "prediciton.xlsx", "dataset_commandes.xlsx"]
-data_path = None
-for c in candidates:
-    if os.path.exists(c):
-        data_path = c
-        break
-
-if data_path is None:
-    print("❌ Erreur : aucun dataset trouvé pour l’entraînement.")
-    sys.exit(1)
-
-print(f"📖 Lecture du fichier d’entraînement : {data_path}")
-df = pd.read_excel(data_path)
-
-# --------- 2) Normaliser les noms de colonnes ----------
-df.columns = (
-    df.columns.str.strip()
-              .str.replace(" ", "_")
-              .str.replace("-", "_")
-              .str.replace("'", "_")
+from ingest import iter_chunks, read_table
+from dataset_cache import CACHE_DIR, DATASET_PARAMS, cache_key, cache_size, load_datasets, make_datasets, save_datasets
+from out_of_core import DEFAULT_CHUNK_SIZE, FeatureFile, build_datasets, predict_file, write_features
+from scoring import THRESHOLD, load_artifacts, model_proba
+from tuning import (
+    DEFAULT_TIME_BUDGET, EARLY_STOPPING, MAX_ROUNDS, PRUNED, SEARCH_SPACE, TRIALS_LOG,
+    balanced_weights, booster_params, tune
+)
+from features import (
+    DEFAULT_HASH_BUCKETS, DEFAULT_MIN_FREQUENCY, ENCODINGS, PIPELINE_PATH,
+    FeaturePipeline, normalize_columns, save_pipeline
 )
 
-# --------- 3) Détection colonne cible ----------
-possible_targets = ["fausse_commande", "fausse-commande", "fausse commande", "is_fake", "is fake", "isfake"]
-target_col = None
-for t in possible_targets:
-    if t in df.columns.str.lower():
-        target_col = [c for c in df.columns if c.lower() == t][0]
-        break
-
-if target_col is None:
-    print("❌ Erreur : impossible de trouver la colonne cible (ex: 'is_fake').")
-    sys.exit(1)
-
-df = df.rename(columns={target_col: "is_fake"})
-target = "is_fake"
-
-# --------- 4) Features temporelles ----------
-date_cols = [c for c in df.columns if "date" in c.lower() or "creation" in c.lower()]
-if len(date_cols) > 0:
-    date_col = date_cols[0]
-    print("🕒 Colonne date trouvée :", date_col)
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-    df["year"] = df[date_col].dt.year.fillna(-1).astype(int)
-    df["month"] = df[date_col].dt.month.fillna(-1).astype(int)
-    df["day"] = df[date_col].dt.day.fillna(-1).astype(int)
-    df["dayofweek"] = df[date_col].dt.dayofweek.fillna(-1).astype(int)
-    df = df.drop(columns=[date_col])
-
-# --------- 5) Préparation X / y ----------
-y = df[target].astype(int)
-X = df.drop(columns=[target])
-
-# Nettoyage NaN
-num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
-cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
-X[num_cols] = X[num_cols].fillna(-999)
-X[cat_cols] = X[cat_cols].fillna("NA")
-
-# Encodage catégoriel
-enc = None
-if len(cat_cols) > 0:
-    enc = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=-1)
-    X[cat_cols] = enc.fit_transform(X[cat_cols])
-
-X = X.astype(float)
-
-# --------- 6) Split ----------
-X_train, X_tmp, y_train, y_tmp = train_test_split(X, y, test_size=0.30, stratify=y, random_state=42)
-X_val, X_test, y_val, y_test = train_test_split(X_tmp, y_tmp, test_size=0.5, stratify=y_tmp, random_state=42)
-
-print("📊 Taille des sets -> train:", X_train.shape, "val:", X_val.shape, "test:", X_test.shape)
-
-# --------- 7) Modèle ----------
-model = lgb.LGBMClassifier(
+MODEL_PATH = "lgb_model.joblib"
+# Commandes étiquetées ajoutées par --incremental, reprises par les entraînements complets
+HISTORY_PATH = "historique_commandes.parquet"
+DEFAULT_INCREMENTAL_ROUNDS = 100
+# Rapport d'évaluation et de performance écrit à la fin de chaque entraînement complet
+REPORT_PATH = "training_report.json"
+INFERENCE_REPEATS = 3
+
+# Paramètres du modèle (point de départ de --tune, qui remplace une partie d'entre eux)
+MODEL_PARAMS = dict(
     objective="binary",
     n_estimators=1000,
     learning_rate=0.05,
@@ -95,19 +46,438 @@ model = lgb.LGBMClassifier(
     n_jobs=-1
 )
 
-model.fit(
-    X_train, y_train,
-    eval_set=[(X_val, y_val)],
-    eval_metric="auc",
-    callbacks=[lgb.early_stopping(50)]
-)
 
-# --------- 8) Sauvegarde ----------
-joblib.dump(model, "lgb_model.joblib")
-print("✅ Modèle sauvegardé -> lgb_model.joblib")
+# --------- 1) Trouver le dataset d'entraînement ----------
+def find_dataset(data_path=None):
+    # Fichier fourni (--data : .xlsx, .csv ou .parquet), sinon classeur par défaut
+    if data_path is not None:
+        return data_path if os.path.exists(data_path) else None
+    candidates = ["prediction.xlsx", "prediciton.xlsx", "dataset_commandes.xlsx"]
+    for c in candidates:
+        if os.path.exists(c):
+            return c
+    return None
+
+
+# --------- 3) Détection colonne cible ----------
+def find_target(columns):
+    possible_targets = ["fausse_commande", "fausse-commande", "fausse commande", "is_fake", "is fake", "isfake"]
+    for t in possible_targets:
+        if t in columns.str.lower():
+            return [c for c in columns if c.lower() == t][0]
+    return None
+
+
+# --------- Historique des commandes ajoutées en mode incrémental ----------
+def load_history(path=HISTORY_PATH):
+    return pd.read_parquet(path) if os.path.exists(path) else None
+
+
+def append_history(df, path=HISTORY_PATH):
+    history = load_history(path)
+    if history is not None:
+        df = pd.concat([history, df], ignore_index=True)
+    # Écriture atomique : un historique à moitié écrit ne doit jamais être relu
+    tmp = path + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return len(df)
+
+
+def split_sets(X, y):
+    # 70 % entraînement, 15 % validation (arrêt anticipé), 15 % test
+    X_train, X_tmp, y_train, y_tmp = train_test_split(X, y, test_size=0.30, stratify=y, random_state=42)
+    X_val, X_test, y_val, y_test = train_test_split(X_tmp, y_tmp, test_size=0.5, stratify=y_tmp, random_state=42)
+    return X_train, X_val, X_test, y_train, y_val, y_test
+
+
+def best_booster(model):
+    # Booster limité à la meilleure itération : les arbres gardés après l'arrêt
+    # anticipé ne servent pas à la prédiction et ne doivent pas être prolongés.
+    # model : lgb.Booster (fit_booster), ou LGBMClassifier des anciens modèles
+    booster = getattr(model, "booster_", model)
+    best = getattr(model, "best_iteration_", None) or booster.best_iteration
+    if not best or best >= booster.current_iteration():
+        return booster
+    return lgb.Booster(model_str=booster.model_to_string(num_iteration=best))
+
+
+def model_params(model):
+    # Paramètres LGBMClassifier du modèle : gardés sur le Booster par fit_booster
+    # (meilleur essai de --tune compris), relus du wrapper d'un ancien LGBMClassifier
+    params = getattr(model, "model_params", None)
+    if params is not None:
+        return dict(params)
+    if hasattr(model, "get_params"):
+        known = set(MODEL_PARAMS) | set(SEARCH_SPACE) | {"subsample_freq"}
+        return {**MODEL_PARAMS, **{k: v for k, v in model.get_params().items() if k in known}}
+    return dict(MODEL_PARAMS)
+
+
+def warm_start(model, pipeline, df, target_col, rounds=DEFAULT_INCREMENTAL_ROUNDS):
+    # Reprise de l'entraînement sur de nouvelles commandes étiquetées : vocabulaire
+    # complété (codes existants inchangés), puis au plus `rounds` arbres ajoutés
+    # au modèle existant (init_model). Le pipeline est modifié sur place.
+    # Retourne (modèle mis à jour, modalités ajoutées, AUC test avant / après).
+    X_raw = df.drop(columns=[target_col])
+    y = df[target_col].astype(int)
+    before = copy.deepcopy(pipeline)
+    added = pipeline.extend(X_raw)
+    X = pipeline.transform(X_raw)
+    X_train, X_val, X_test, y_train, y_val, y_test = split_sets(X, y)
+
+    train_set, valid_set = make_datasets(X_train, y_train, X_val, y_val, pipeline.feature_names, construct=False)
+    params = model_params(model)
+    updated = fit_booster({**params, "n_estimators": rounds}, train_set, valid_set, init_model=best_booster(model))
+    # Paramètres du modèle d'origine (et non le nombre d'arbres de la mise à jour)
+    updated.model_params = params
+
+    # Même split test, ancien modèle évalué avec l'ancien vocabulaire
+    _, _, X_test_before, _, _, _ = split_sets(before.transform(X_raw), y)
+    auc_before = roc_auc_score(y_test, model_proba(model, X_test_before))
+    auc_after = roc_auc_score(y_test, model_proba(updated, X_test))
+    return updated, added, auc_before, auc_after
+
+
+def incremental(args):
+    print(f"📖 Nouvelles commandes étiquetées : {args.incremental}")
+    start = time.perf_counter()
+    df = read_table(args.incremental)
+    df.columns = normalize_columns(df.columns)
+    target_col = find_target(df.columns)
+    if target_col is None:
+        print("❌ Erreur : impossible de trouver la colonne cible (ex: 'is_fake').")
+        sys.exit(1)
+
+    model, pipeline = load_artifacts(MODEL_PATH, PIPELINE_PATH)
+    n_trees = getattr(model, "booster_", model).current_iteration()
+    try:
+        model, added, auc_before, auc_after = warm_start(model, pipeline, df, target_col, args.rounds)
+    except ValueError as e:
+        # Trop peu de commandes (ou une seule classe) pour le split stratifié
+        print(f"❌ Erreur : mise à jour impossible sur ces commandes ({e})")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    for col, n in added.items():
+        print(f"🔤 {col} : {n} nouvelles modalités")
+    print(f"🌲 {n_trees} -> {model.current_iteration()} arbres (jusqu'à la meilleure itération)")
+    print(f"📈 AUC test des nouvelles commandes : {auc_before:.4f} -> {auc_after:.4f} ({auc_after - auc_before:+.4f})")
+
+    save_artifacts(model, pipeline)
+    n_history = append_history(df)
+    print(f"🗂️ {len(df)} commandes ajoutées à l'historique -> {HISTORY_PATH} ({n_history} au total)")
+
+    print(f"\n🎉 Mise à jour incrémentale terminée en {elapsed:.1f}s !")
+
+
+def make_pipeline(args):
+    return FeaturePipeline(
+        encoding=args.encoding,
+        hash_buckets=args.hash_buckets,
+        min_frequency=args.min_frequency,
+        max_categories=args.max_categories,
+        velocity=args.velocity,
+    )
+
+
+def save_artifacts(model, pipeline):
+    # Écritures atomiques : serve.py / BI.py (ModelStore) ne relisent jamais un fichier à moitié
+    # écrit, et attendent que les deux fichiers aient changé pour recharger la paire
+    joblib.dump(model, MODEL_PATH + ".tmp")
+    os.replace(MODEL_PATH + ".tmp", MODEL_PATH)
+    print(f"✅ Modèle sauvegardé -> {MODEL_PATH} ({os.path.getsize(MODEL_PATH) / 1024:.0f} Ko)")
+
+    save_pipeline(pipeline, PIPELINE_PATH + ".tmp")
+    os.replace(PIPELINE_PATH + ".tmp", PIPELINE_PATH)
+    print(f"✅ Pipeline de features sauvegardé -> {PIPELINE_PATH} ({os.path.getsize(PIPELINE_PATH) / 1024:.0f} Ko)")
+
+
+def fit_booster(params, train_set, valid_set, init_model=None, first_metric_only=False):
+    # Paramètres LGBMClassifier (MODEL_PARAMS, ajustés par --tune) appliqués à des Datasets
+    # construits ; seuls les arbres jusqu'à la meilleure itération sont gardés.
+    # first_metric_only=True : arrêt sur l'AUC seule, la règle des essais de --tune
+    # Seul type de modèle sauvegardé par prediction.py (tous modes, --incremental compris) :
+    # les paramètres restent attachés au Booster (model_params, conservé par joblib)
+    booster = lgb.train(
+        booster_params(params), train_set, num_boost_round=params["n_estimators"], valid_sets=[valid_set],
+        init_model=init_model, callbacks=[lgb.early_stopping(EARLY_STOPPING, first_metric_only=first_metric_only)]
+    )
+    booster = lgb.Booster(model_str=booster.model_to_string(num_iteration=booster.best_iteration))
+    booster.model_params = dict(params)
+    return booster
+
+
+def test_proba(booster, X_test):
+    # Matrice en mémoire, ou fichier de features (--out-of-core, cache des Datasets)
+    return predict_file(booster, X_test) if isinstance(X_test, FeatureFile) else booster.predict(X_test)
+
+
+def datasets_in_memory(data_path, history_path, pipeline, timings=None):
+    # timings : durées des étapes (secondes), complétées pour le rapport d'entraînement
+    timings = {} if timings is None else timings
+    print(f"📖 Lecture du fichier d’entraînement : {data_path}")
+    start = time.perf_counter()
+    # Classeur Excel relu depuis son cache Parquet s'il n'a pas changé (ingest.py)
+    df = read_table(data_path)
+    history = load_history(history_path) if history_path else None
+    timings["lecture"] = time.perf_counter() - start
+    print(f"   {len(df)} lignes lues en {timings['lecture']:.2f}s")
+
+    # --------- 2) Normaliser les noms de colonnes ----------
+    start = time.perf_counter()
+    df.columns = normalize_columns(df.columns)
+
+    # Commandes ajoutées depuis par --incremental
+    if history is not None:
+        missing = set(df.columns) - set(history.columns)
+        if missing:
+            print(f"⚠️ Historique {history_path} ignoré : colonnes absentes {sorted(missing)}")
+        else:
+            df = pd.concat([df, history[df.columns]], ignore_index=True)
+            print(f"🗂️ {len(history)} commandes reprises de l'historique {history_path}")
+
+    target_col = find_target(df.columns)
+    if target_col is None:
+        print("❌ Erreur : impossible de trouver la colonne cible (ex: 'is_fake').")
+        sys.exit(1)
+
+    y = df[target_col].astype(int)
+    X_raw = df.drop(columns=[target_col])
+    timings["pretraitement"] = time.perf_counter() - start
+
+    # --------- 4) Features : dates, NaN, encodage (pipeline partagé avec l'inférence) ----------
+    start = time.perf_counter()
+    X = pipeline.fit_transform(X_raw)
+    timings["encodage"] = time.perf_counter() - start
+    if pipeline.date_col:
+        print("🕒 Colonne date trouvée :", pipeline.date_col)
+
+    # --------- 5) Split ----------
+    start = time.perf_counter()
+    X_train, X_val, X_test, y_train, y_val, y_test = split_sets(X, y)
+    train_set, valid_set = make_datasets(X_train, y_train, X_val, y_val, pipeline.feature_names)
+    timings["datasets"] = time.perf_counter() - start
+    return train_set, valid_set, X_test, y_test.to_numpy()
+
+
+def datasets_out_of_core(data_path, pipeline, work_dir, chunk_size, timings=None):
+    # Fichier lu par blocs, features sur disque, Datasets LightGBM construits par lots (out_of_core.py).
+    # Lecture et prétraitement se font bloc par bloc pendant l'encodage : une seule étape chronométrée
+    timings = {} if timings is None else timings
+    target_col = find_target(normalize_columns(next(iter_chunks(data_path, 1)).columns))
+    if target_col is None:
+        print("❌ Erreur : impossible de trouver la colonne cible (ex: 'is_fake').")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    features, labels = write_features(data_path, target_col, pipeline, work_dir, chunk_size)
+    timings["encodage"] = time.perf_counter() - start
+    size = sum(os.path.getsize(f.path) for f in features.values())
+    print(f"🧱 {sum(len(y) for y in labels.values())} lignes transformées par blocs de {chunk_size} "
+          f"en {timings['encodage']:.2f}s ({size / 1024 ** 2:.0f} Mo de features float32 sur disque)")
+    start = time.perf_counter()
+    try:
+        train_set, valid_set = build_datasets(features, labels, pipeline.feature_names,
+                                              balanced_weights(labels["train"]), DATASET_PARAMS)
+    finally:
+        features["train"].close()
+        features["val"].close()
+    timings["datasets"] = time.perf_counter() - start
+    return train_set, valid_set, features["test"], labels["test"]
+
+
+# --------- Rapport d'entraînement ----------
+def evaluate(y_test, proba, threshold=THRESHOLD):
+    # Métriques du jeu de test au seuil de décision utilisé au scoring (scoring.THRESHOLD)
+    y_test = np.asarray(y_test).astype(int)
+    y_pred = (proba >= threshold).astype(int)
+    tn, fp, fn, tp = confusion_matrix(y_test, y_pred, labels=[0, 1]).ravel()
+    return {
+        "commandes": int(len(y_test)),
+        "fausses": int(y_test.sum()),
+        "auc": float(roc_auc_score(y_test, proba)),
+        "average_precision": float(average_precision_score(y_test, proba)),
+        "f1": float(f1_score(y_test, y_pred, zero_division=0)),
+        "matrice_confusion": {"vrais_negatifs": int(tn), "faux_positifs": int(fp),
+                              "faux_negatifs": int(fn), "vrais_positifs": int(tp)},
+        "classification": classification_report(
+            y_test, y_pred, labels=[0, 1], target_names=["légitime", "fausse"], output_dict=True, zero_division=0
+        ),
+    }
+
+
+def timed_inference(model, X_test, n_rows, repeats=INFERENCE_REPEATS):
+    # (probabilités, lignes/s) : meilleur de `repeats` passages sur le jeu de test
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proba = test_proba(model, X_test)
+        best = min(best, time.perf_counter() - start)
+    return proba, n_rows / best if best > 0 else None
+
+
+def write_report(report, path=REPORT_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Entraînement du modèle de fausses commandes")
+    parser.add_argument("--data", default=None,
+                        help="Dataset d'entraînement (.xlsx, .csv ou .parquet ; défaut : prediction.xlsx)")
+    parser.add_argument("--encoding", choices=ENCODINGS, default="ordinal",
+                        help="Encodage des colonnes catégorielles (ordinal, hash ou frequency)")
+    parser.add_argument("--hash-buckets", type=int, default=DEFAULT_HASH_BUCKETS)
+    parser.add_argument("--min-frequency", type=int, default=DEFAULT_MIN_FREQUENCY)
+    parser.add_argument("--max-categories", type=int, default=None)
+    parser.add_argument("--velocity", action="store_true",
+                        help="Ajouter les features de vélocité par IP / téléphone / nom (velocity.py)")
+    parser.add_argument("--tune", action="store_true",
+                        help="Recherche d'hyperparamètres (tuning.py) avant l'entraînement final")
+    parser.add_argument("--time-budget", type=float, default=DEFAULT_TIME_BUDGET,
+                        help="Budget de la recherche, en secondes (défaut : 3600)")
+    parser.add_argument("--max-trials", type=int, default=None)
+    parser.add_argument("--parallel", type=int, default=None,
+                        help="Essais entraînés en parallèle (défaut : min(4, nombre de coeurs))")
+    parser.add_argument("--incremental", default=None, metavar="FICHIER",
+                        help="Nouvelles commandes étiquetées : reprise du modèle existant au lieu d'un entraînement complet")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_INCREMENTAL_ROUNDS,
+                        help="Arbres ajoutés au plus en mode incrémental (défaut : 100)")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="Fichier lu par blocs et features sur disque : mémoire bornée pour les très gros historiques")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Lignes par bloc en --out-of-core (défaut : 100000)")
+    parser.add_argument("--work-dir", default=None,
+                        help="Dossier des fichiers de features temporaires en --out-of-core (défaut : dossier temporaire)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help=f"Reconstruire les Datasets LightGBM sans lire ni écrire le cache {CACHE_DIR}")
+    parser.add_argument("--report", default=REPORT_PATH,
+                        help="Rapport JSON de l'entraînement : métriques de test, durées, tailles (défaut : training_report.json)")
+    parser.add_argument("--no-history", action="store_true",
+                        help=f"Ne pas reprendre les commandes de {HISTORY_PATH} dans l'entraînement complet")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.incremental is not None:
+        incremental(args)
+        return
+    data_path = find_dataset(args.data)
+    if data_path is None:
+        print("❌ Erreur : aucun dataset trouvé pour l’entraînement.")
+        sys.exit(1)
+    if args.out_of_core and args.velocity:
+        # Vélocité calculée en un passage chronologique sur tout l'historique :
+        # incompatible avec la lecture par blocs d'un fichier non trié par date
+        print("❌ Erreur : --velocity n'est pas disponible avec --out-of-core.")
+        sys.exit(1)
+    pipeline = make_pipeline(args)
+    if args.out_of_core and not args.no_history and os.path.exists(HISTORY_PATH):
+        print(f"⚠️ Historique {HISTORY_PATH} non repris en --out-of-core (à ajouter au fichier source)")
+    use_history = not (args.no_history or args.out_of_core) and os.path.exists(HISTORY_PATH)
+    history_path = HISTORY_PATH if use_history else None
+    sources = [data_path] + ([history_path] if history_path else [])
+    key = None if args.no_cache else cache_key(sources, pipeline, "out_of_core" if args.out_of_core else "memory")
+
+    started = time.perf_counter()
+    # Durées des étapes en secondes (rapport d'entraînement), dans l'ordre d'exécution
+    timings = {}
+    with tempfile.TemporaryDirectory(prefix="features_", dir=args.work_dir) as work_dir:
+        # --------- Datasets LightGBM : relus du cache, sinon lecture, features, split et bins ----------
+        start = time.perf_counter()
+        cached = load_datasets(key) if key else None
+        if cached is not None:
+            train_set, valid_set, X_test, y_test, pipeline = cached
+            timings["cache"] = time.perf_counter() - start
+            print(f"♻️ Datasets LightGBM relus du cache {os.path.join(CACHE_DIR, key)} en {timings['cache']:.2f}s")
+        else:
+            if args.out_of_core:
+                train_set, valid_set, X_test, y_test = datasets_out_of_core(data_path, pipeline, work_dir,
+                                                                            args.chunk_size, timings)
+            else:
+                train_set, valid_set, X_test, y_test = datasets_in_memory(data_path, history_path, pipeline, timings)
+            print(f"🧱 Datasets LightGBM construits en {time.perf_counter() - start:.2f}s")
+            start = time.perf_counter()
+            if key and save_datasets(key, train_set, valid_set, X_test, y_test, pipeline):
+                timings["cache"] = time.perf_counter() - start
+                print(f"💾 Datasets mis en cache -> {os.path.join(CACHE_DIR, key)} "
+                      f"({cache_size(key) / 1024 ** 2:.1f} Mo)")
+        print(f"🔤 Encodage des colonnes catégorielles : {pipeline.encoding}")
+        print("📊 Taille des sets -> train:", train_set.num_data(), "val:", valid_set.num_data(), "test:", len(y_test))
+
+        try:
+            # --------- 6) Modèle (paramètres par défaut ou meilleur essai de la recherche) ----------
+            params = dict(MODEL_PARAMS)
+            best = None
+            if args.tune:
+                start = time.perf_counter()
+                print(f"🔎 Recherche d'hyperparamètres : budget {args.time_budget:.0f}s, journal -> {TRIALS_LOG}")
+                best, trials, elapsed = tune(
+                    train_set, valid_set, MODEL_PARAMS,
+                    time_budget=args.time_budget, max_trials=args.max_trials, parallel=args.parallel,
+                )
+                n_pruned = sum(t["statut"] == PRUNED for t in trials)
+                print(f"📈 {len(trials)} essais en {elapsed:.0f}s ({len(trials) / elapsed * 3600:.0f} essais/heure), "
+                      f"dont {n_pruned} élagués")
+                if best is None:
+                    print("⚠️ Aucun essai terminé dans le budget : paramètres par défaut conservés")
+                else:
+                    print(f"🏆 Meilleur essai {best['essai']} : AUC val {best['auc_val']:.4f}, {best['params']}")
+                    # Même plafond d'arbres et même arrêt que l'essai : le modèle final est celui de l'essai
+                    params.update(best["params"], n_estimators=MAX_ROUNDS)
+                timings["recherche"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model = fit_booster(params, train_set, valid_set, first_metric_only=best is not None)
+            timings["entrainement"] = time.perf_counter() - start
+
+            # --------- 7) Évaluation sur le jeu de test (jamais vu par l'entraînement) ----------
+            proba, rows_per_s = timed_inference(model, X_test, len(y_test))
+            metrics = evaluate(y_test, proba)
+            print(f"📈 Test (seuil {THRESHOLD}) : AUC {metrics['auc']:.4f}, AP {metrics['average_precision']:.4f}, "
+                  f"F1 {metrics['f1']:.4f} ; inférence {rows_per_s:,.0f} lignes/s")
+            print(classification_report(y_test, (proba >= THRESHOLD).astype(int), labels=[0, 1],
+                                        target_names=["légitime", "fausse"], zero_division=0))
+        finally:
+            if isinstance(X_test, FeatureFile):
+                X_test.close()
+
+    # --------- 8) Sauvegarde ----------
+    start = time.perf_counter()
+    save_artifacts(model, pipeline)
+    timings["sauvegarde"] = time.perf_counter() - start
+
+    # --------- 9) Rapport JSON (comparaison entre versions du modèle) ----------
+    write_report({
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "donnees": {
+            "sources": sources,
+            "mode": "out_of_core" if args.out_of_core else "memoire",
+            "datasets_en_cache": cached is not None,
+            "lignes": {"train": train_set.num_data(), "val": valid_set.num_data(), "test": len(y_test)},
+        },
+        "pipeline": {**pipeline.config(), "features": list(pipeline.feature_names)},
+        "modele": {
+            "lightgbm": lgb.__version__,
+            "params": params,
+            "n_arbres": model.num_trees(),
+            "meilleur_essai": best["essai"] if best else None,
+        },
+        "seuil": THRESHOLD,
+        "test": metrics,
+        "inference": {"lignes_par_seconde": rows_per_s, "passages": INFERENCE_REPEATS},
+        "durees_s": {**{k: round(v, 3) for k, v in timings.items()},
+                     "total": round(time.perf_counter() - started, 3)},
+        "tailles_octets": {path: os.path.getsize(path) for path in (MODEL_PATH, PIPELINE_PATH)},
+    }, args.report)
+    print(f"🧾 Rapport d'entraînement -> {args.report}")
+
+    print("\n🎉 Entraînement terminé avec succès !")
 
-if enc is not None:
-    joblib.dump(enc, "ordinal_encoder.joblib")
-    print("✅ Encodeur sauvegardé -> ordinal_encoder.joblib")
 
-print("\n🎉 Entraînement terminé avec succès !")
+if __name__ == "__main__":
+    main()
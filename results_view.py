@@ -0,0 +1,69 @@
+import math
+import numpy as np
+import pandas as pd
+from scoring import PREDICTION_COL, PROBA_COL
+
+# =========================
+# Vue des résultats de prédiction (calculs côté serveur)
+# =========================
+# La page Prédiction n'envoie plus tout le fichier scoré au navigateur :
+# statistiques, histogramme et commandes les plus risquées sont calculés ici,
+# et le tableau n'affiche qu'une page (filtrée, triée) à la fois. Ce qui part
+# au navigateur ne dépend plus du nombre de commandes importées.
+
+HIST_BINS = 20
+TOP_RISK = 10
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def summary(df):
+    n = len(df)
+    n_fake = int(df[PREDICTION_COL].sum()) if n else 0
+    return {
+        "commandes": n,
+        "fausses": n_fake,
+        "taux": n_fake / n if n else 0.0,
+        "proba_moyenne": float(df[PROBA_COL].mean()) if n else 0.0,
+    }
+
+
+def histogram(proba, bins=HIST_BINS):
+    # Nombre de commandes par tranche de probabilité (bins valeurs, quelle que soit la taille)
+    counts, edges = np.histogram(np.asarray(proba, dtype=float), bins=bins, range=(0.0, 1.0))
+    return pd.DataFrame({
+        "Probabilité": [f"{a:.2f}–{b:.2f}" for a, b in zip(edges[:-1], edges[1:])],
+        "Commandes": counts,
+    })
+
+
+def top_risk(df, n=TOP_RISK):
+    return df.nlargest(n, PROBA_COL)
+
+
+def filter_rows(df, only_fake=False, min_proba=0.0, search=""):
+    # Positions des lignes retenues (ordre d'origine)
+    mask = np.ones(len(df), dtype=bool)
+    if only_fake:
+        mask &= df[PREDICTION_COL].to_numpy() == 1
+    if min_proba > 0:
+        mask &= df[PROBA_COL].to_numpy() >= min_proba
+    search = search.strip()
+    if search:
+        # Recherche dans les colonnes texte, sans regex ni casse
+        found = np.zeros(len(df), dtype=bool)
+        for col in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_datetime64_any_dtype(df[col]):
+                found |= df[col].astype("str").str.contains(search, case=False, regex=False, na=False).to_numpy()
+        mask &= found
+    return np.flatnonzero(mask)
+
+
+def page_of(df, rows, sort_col=None, ascending=True, page=1, page_size=PAGE_SIZES[1]):
+    # (lignes de la page demandée, page effective, nombre de pages) ; tri stable,
+    # valeurs manquantes en dernier ; la page est ramenée dans [1, nombre de pages]
+    if sort_col is not None and len(rows):
+        values = df[sort_col].iloc[rows].reset_index(drop=True)
+        rows = rows[values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()]
+    n_pages = max(1, math.ceil(len(rows) / page_size))
+    page = min(max(page, 1), n_pages)
+    return df.iloc[rows[(page - 1) * page_size:page * page_size]], page, n_pages
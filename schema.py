@@ -0,0 +1,166 @@
+import re
+import unicodedata
+import pandas as pd
+import pyarrow.parquet as pq
+from ingest import file_format, iter_excel_rows, read_table
+
+# =========================
+# Schéma des fichiers à scorer
+# =========================
+# Déclaration unique des colonnes attendues : nom canonique (celui des features
+# du modèle, après normalize_columns), alias acceptés, type et caractère
+# obligatoire. L'en-tête est lu seul, résolu en noms canoniques, puis seules
+# les colonnes du schéma sont lues avec leur type explicite (usecols / dtype /
+# columns) : pas d'inférence de type sur les autres colonnes d'un classeur large.
+# Les en-têtes sont comparés sans casse, sans accents et quels que soient les
+# séparateurs ("Date de création" = "date_de_creation").
+
+class Column:
+    def __init__(self, name, dtype, aliases=(), required=True):
+        self.name = name
+        # "str", "Int64", "float64" ou "datetime"
+        self.dtype = dtype
+        self.aliases = list(aliases)
+        self.required = required
+
+
+UPLOAD_SCHEMA = [
+    Column("@_Ip_du_client", "str", ["ip", "adresse ip", "ip client", "ip du client"]),
+    Column("date_de_creation", "datetime", ["date", "date commande", "date de la commande"]),
+    Column("nom_prenom", "str", ["nom", "client", "nom et prenom", "nom complet"]),
+    Column("numero_de_telephone", "Int64", ["telephone", "tel", "numero telephone", "numero"]),
+    Column("Qte", "Int64", ["quantite", "qty"]),
+    Column("Wilaya", "str", ["wilaya client"]),
+    Column("Commune", "str", ["commune client"]),
+    Column("SKU_d_article", "str", ["sku", "article", "sku article"]),
+    Column("Boutique", "str", ["magasin", "store"]),
+    Column("montant_total", "float64", ["montant", "total"]),
+    # Facultative : conservée telle quelle pour rapprocher les résultats des commandes
+    Column("id_commande", "str", ["id", "commande", "numero de commande", "reference"], required=False),
+]
+
+
+class SchemaError(ValueError):
+    # Colonnes obligatoires absentes, ou message d'une valeur refusée (missing vide)
+    def __init__(self, missing, found, message=None):
+        super().__init__(message or f"Colonnes manquantes : {', '.join(missing)}")
+        self.missing = missing
+        self.found = found
+
+    def __reduce__(self):
+        # Relevée dans un worker de score.py : transmise au processus principal par pickle
+        return SchemaError, (self.missing, self.found, str(self))
+
+
+def column_key(name):
+    # "Date de création" / "date_de_creation" / "DATE-DE-CREATION" -> "date_de_creation"
+    name = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[\s\-'_]+", "_", name.strip().lower()).strip("_")
+
+
+class UploadSchema:
+    def __init__(self, columns=UPLOAD_SCHEMA):
+        self.columns = columns
+        # Clé normalisée (nom canonique ou alias) -> colonne
+        self._keys = {}
+        for col in columns:
+            for key in [col.name] + col.aliases:
+                self._keys.setdefault(column_key(key), col)
+
+    @property
+    def required(self):
+        return [c.name for c in self.columns if c.required]
+
+    def resolve(self, header):
+        # En-tête du fichier -> {nom d'origine: nom canonique} (première occurrence
+        # retenue si deux en-têtes désignent la même colonne)
+        mapping, seen = {}, set()
+        for name in header:
+            col = self._keys.get(column_key(name)) if name is not None else None
+            if col is not None and col.name not in seen:
+                mapping[name] = col.name
+                seen.add(col.name)
+        return mapping
+
+    def validate(self, header):
+        header = list(header)
+        mapping = self.resolve(header)
+        missing = [name for name in self.required if name not in mapping.values()]
+        if missing:
+            raise SchemaError(missing, header)
+        return mapping
+
+    # -------- Lecture --------
+    def read_header(self, source, fmt):
+        if fmt == "csv":
+            header = list(pd.read_csv(source, nrows=0).columns)
+        elif fmt == "parquet":
+            header = pq.read_schema(source).names
+        else:
+            # openpyxl en lecture seule : seule la première ligne est parcourue
+            rows = iter_excel_rows(source)
+            header = list(next(rows, ()))
+            rows.close()
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return header
+
+    def read(self, source, fmt=None, extra=False):
+        # source : chemin ou fichier (UploadedFile de Streamlit). Retourne
+        # (DataFrame aux noms canoniques, {nom d'origine: nom canonique}).
+        # extra=True conserve aussi les colonnes hors schéma (types inférés).
+        # Lecture par ingest.py (classeurs Excel mis en cache au format Parquet).
+        fmt = fmt or file_format(getattr(source, "name", source))
+        header = self.read_header(source, fmt)
+        mapping = self.validate(header)
+        usecols = None if extra else list(mapping)
+        dates = [k for k, v in mapping.items() if self._column(v).dtype == "datetime"] if fmt == "csv" else None
+        df = read_table(source, usecols=usecols, dtype=self.read_dtypes(mapping), parse_dates=dates, fmt=fmt)
+        return self.apply(df, mapping), mapping
+
+    def read_dtypes(self, mapping):
+        # dtype imposé au lecteur, par nom d'origine : colonnes texte seulement.
+        # Nombres et dates sont convertis ensuite (valeurs invalides -> manquantes)
+        return {k: "str" for k, v in mapping.items() if self._column(v).dtype == "str"}
+
+    def apply(self, df, mapping=None, first_row=0):
+        # Renomme en noms canoniques et impose les types du schéma.
+        # first_row : position de la première ligne de df dans le fichier (lecture par blocs)
+        mapping = self.validate(df.columns) if mapping is None else mapping
+        found = list(df.columns)
+        df = df.rename(columns=mapping)
+        for name in mapping.values():
+            dtype = self._column(name).dtype
+            if dtype == "datetime":
+                if not pd.api.types.is_datetime64_any_dtype(df[name]):
+                    df[name] = pd.to_datetime(df[name], errors="coerce")
+            elif df[name].dtype != dtype:
+                if dtype == "str":
+                    # Valeurs manquantes gardées manquantes (pandas 2 les change en "nan" / "None") :
+                    # le pipeline leur applique le même remplissage qu'à l'entraînement
+                    df[name] = df[name].astype("str").where(df[name].notna())
+                else:
+                    values = pd.to_numeric(df[name], errors="coerce")
+                    if dtype == "Int64":
+                        # Valeur décimale ou infinie : refusée plutôt qu'arrondie en silence
+                        bad = values.notna() & (values % 1 != 0)
+                        if bad.any():
+                            pos = int(bad.to_numpy().argmax())
+                            origin = next(k for k, v in mapping.items() if v == name)
+                            raise SchemaError([], found, (
+                                f"Colonne {origin} : valeur non entière {values.iloc[pos]} "
+                                f"(ligne {first_row + pos + 2} du fichier, en-tête compris)"))
+                    df[name] = values.astype(dtype)
+        return df
+
+    def _column(self, name):
+        return self._keys[column_key(name)]
+
+    def describe(self):
+        # Tableau des colonnes attendues (affiché quand un fichier est refusé)
+        return pd.DataFrame({
+            "Colonne": [c.name for c in self.columns],
+            "Type": [c.dtype for c in self.columns],
+            "Obligatoire": ["oui" if c.required else "non" for c in self.columns],
+            "Alias acceptés": [", ".join(c.aliases) for c in self.columns],
+        })
@@ -0,0 +1,237 @@
+import os
+import sys
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow.parquet as pq
+from export import ChunkWriter
+from features import PIPELINE_PATH
+from ingest import file_format, iter_chunks
+from schema import SchemaError, UploadSchema
+from scoring import ENCODER_PATH, MODEL_PATH, PREDICTION_COL, THRESHOLD, load_artifacts, score_frame
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# =========================
+# Scoring en ligne de commande (fichiers volumineux)
+# =========================
+# Usage : python score.py commandes.csv [-o commandes_scored.csv] [--chunk-size 50000] [--workers 4]
+# Lit le fichier (CSV, Parquet ou Excel) par blocs de taille fixe, applique le
+# même prétraitement que la page Prédiction (scoring.py) et écrit chaque bloc
+# scoré dès qu'il est prêt : la mémoire reste bornée quelle que soit la taille
+# du fichier.
+# --workers N : les blocs sont prétraités et scorés dans N processus (modèle
+# chargé une fois par worker), puis écrits dans l'ordre d'origine. Les blocs
+# d'un fichier Parquet sont lus par les workers eux-mêmes (par row groups).
+# L'en-tête est validé avant tout chargement (schema.py) : colonnes obligatoires,
+# alias et types ; les autres colonnes du fichier sont recopiées telles quelles.
+
+DEFAULT_CHUNK_SIZE = 50_000
+SCHEMA = UploadSchema()
+
+
+def peak_rss_mb(children=False):
+    # Pic de mémoire résidente du processus, ou du plus gros processus fils (None si indisponible)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+# =========================
+# Lecture par blocs
+# =========================
+def read_mapping(path):
+    # {en-tête d'origine: nom canonique} ; SchemaError si une colonne obligatoire manque
+    return SCHEMA.validate(SCHEMA.read_header(path, file_format(path)))
+
+
+def read_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, mapping=None):
+    # Colonnes texte du schéma lues comme texte (CSV) : pas d'inférence bloc par bloc
+    dtype = SCHEMA.read_dtypes(mapping) if mapping else None
+    yield from iter_chunks(path, chunk_size, dtype)
+
+
+def score_chunk(chunk, mapping, model, pipeline, threshold=THRESHOLD, velocity_store=None, num_threads=0,
+                first_row=0):
+    # Scoring sur les noms canoniques et types du schéma, en-têtes d'origine en sortie.
+    # first_row : position du bloc dans le fichier (ligne citée par SchemaError)
+    scored = score_frame(SCHEMA.apply(chunk, mapping, first_row), model, pipeline, threshold, velocity_store,
+                         num_threads)
+    return scored.rename(columns={v: k for k, v in mapping.items()})
+
+
+def score_file(src, dst, model, pipeline, chunk_size=DEFAULT_CHUNK_SIZE, threshold=THRESHOLD, mapping=None):
+    # Retourne (lignes scorées, fausses commandes prédites)
+    mapping = read_mapping(src) if mapping is None else mapping
+    n_rows = n_fake = 0
+    writer = ChunkWriter(dst)
+    # Vélocité : historique par client conservé d'un bloc à l'autre (fichier chronologique)
+    velocity_store = pipeline.velocity_store()
+    try:
+        for chunk in read_chunks(src, chunk_size, mapping):
+            scored = score_chunk(chunk, mapping, model, pipeline, threshold, velocity_store, first_row=n_rows)
+            writer.write(scored)
+            n_rows += len(scored)
+            n_fake += int(scored[PREDICTION_COL].sum())
+    finally:
+        writer.close()
+    if velocity_store is not None and velocity_store.out_of_order:
+        print(f"⚠️ {velocity_store.out_of_order} commandes hors ordre chronologique d'un bloc à l'autre : "
+              "trier le fichier par date (ou un seul bloc) pour des features de vélocité exactes")
+    return n_rows, n_fake
+
+
+# =========================
+# Scoring parallèle (pool de processus)
+# =========================
+_worker = {}
+
+
+def _init_worker(paths):
+    # Une fois par worker : modèle et pipeline restent chargés pour tous ses blocs
+    _worker["model"], _worker["pipeline"] = load_artifacts(*paths)
+
+
+def _score_task(task, mapping, threshold, first_row):
+    if isinstance(task, tuple):
+        path, row_groups = task
+        task = pq.ParquetFile(path, memory_map=True).read_row_groups(row_groups).to_pandas()
+    # Un thread LightGBM par worker : le parallélisme vient des processus
+    return score_chunk(task, mapping, _worker["model"], _worker["pipeline"], threshold, num_threads=1,
+                       first_row=first_row)
+
+
+def _parquet_tasks(path, chunk_size):
+    # Row groups regroupés par ~chunk_size lignes ; None si un row group est trop gros
+    meta = pq.ParquetFile(path).metadata
+    tasks, group, n = [], [], 0
+    for i in range(meta.num_row_groups):
+        rows = meta.row_group(i).num_rows
+        if rows > 4 * chunk_size:
+            return None
+        group.append(i)
+        n += rows
+        if n >= chunk_size:
+            tasks.append((path, group))
+            group, n = [], 0
+    if group:
+        tasks.append((path, group))
+    return tasks
+
+
+def score_file_parallel(src, dst, paths, workers, chunk_size=DEFAULT_CHUNK_SIZE, threshold=THRESHOLD,
+                        mapping=None):
+    mapping = read_mapping(src) if mapping is None else mapping
+    tasks = _parquet_tasks(src, chunk_size) if file_format(src) == "parquet" else None
+    if tasks is None:
+        tasks = read_chunks(src, chunk_size, mapping)
+    else:
+        meta = pq.ParquetFile(src).metadata
+
+    n_rows = n_fake = 0
+    writer = ChunkWriter(dst)
+    pending = deque()
+
+    def write_next():
+        nonlocal n_rows, n_fake
+        scored = pending.popleft().result()
+        writer.write(scored)
+        n_rows += len(scored)
+        n_fake += int(scored[PREDICTION_COL].sum())
+
+    first_row = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(paths,)) as pool:
+            for task in tasks:
+                pending.append(pool.submit(_score_task, task, mapping, threshold, first_row))
+                if isinstance(task, tuple):
+                    first_row += sum(meta.row_group(i).num_rows for i in task[1])
+                else:
+                    first_row += len(task)
+                # Au plus deux blocs en vol par worker : mémoire bornée, ordre conservé
+                if len(pending) >= 2 * workers:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        writer.close()
+    return n_rows, n_fake
+
+
+def default_output(src):
+    stem, ext = os.path.splitext(src)
+    return f"{stem}_scored{ext}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring des fausses commandes par blocs")
+    parser.add_argument("input", help="Fichier à scorer (.csv, .parquet ou .xlsx)")
+    parser.add_argument("-o", "--output", help="Fichier de sortie (défaut : <input>_scored.<ext>)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--pipeline", default=PIPELINE_PATH)
+    parser.add_argument("--encoder", default=ENCODER_PATH, help="Encodeur des modèles sans pipeline")
+    parser.add_argument("--workers", type=int, default=1, help="Processus de scoring (défaut : 1)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ Erreur : fichier introuvable : {args.input}")
+        sys.exit(1)
+    output = args.output or default_output(args.input)
+    try:
+        file_format(output)
+        mapping = read_mapping(args.input)
+    except SchemaError as e:
+        print(f"❌ Erreur : {e}")
+        print(f"   Colonnes trouvées : {', '.join(str(c) for c in e.found)}")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"❌ Erreur : {e}")
+        sys.exit(1)
+
+    paths = (args.model, args.pipeline, args.encoder)
+    try:
+        model, pipeline = load_artifacts(*paths)
+    except (OSError, ValueError) as e:
+        print(f"❌ Erreur : {e}")
+        sys.exit(1)
+    workers = args.workers
+    if workers > 1 and pipeline.velocity:
+        # L'historique de vélocité se construit commande après commande, dans un seul processus
+        print("⚠️ Pipeline avec features de vélocité : scoring séquentiel (--workers ignoré)")
+        workers = 1
+
+    print(f"📖 Scoring de {args.input} par blocs de {args.chunk_size} lignes ({workers} worker(s))")
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            n_rows, n_fake = score_file_parallel(args.input, output, paths, workers, args.chunk_size,
+                                                 args.threshold, mapping)
+        else:
+            n_rows, n_fake = score_file(args.input, output, model, pipeline, args.chunk_size, args.threshold,
+                                        mapping)
+    except SchemaError as e:
+        # Valeur refusée en cours de lecture : pas de fichier de sortie partiel
+        if os.path.exists(output):
+            os.remove(output)
+        print(f"❌ Erreur : {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    peak = peak_rss_mb()
+    peak_worker = peak_rss_mb(children=True) if workers > 1 else None
+    print(f"✅ {n_rows} commandes scorées -> {output} ({n_fake} fausses commandes prédites)")
+    print(f"⏱️ {elapsed:.2f}s, {n_rows / elapsed if elapsed else 0:,.0f} lignes/s"
+          f", pic mémoire : {f'{peak:.0f} Mo' if peak is not None else 'n/d'}"
+          + (f" (worker : {peak_worker:.0f} Mo)" if peak_worker is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import joblib
+from features import PIPELINE_PATH, FeaturePipeline, load_pipeline
+
+# =========================
+# Scoring du modèle de fausses commandes
+# =========================
+# Le prétraitement est celui du pipeline ajusté à l'entraînement (features.py,
+# feature_pipeline.joblib, versionné avec lgb_model.joblib). Pour un modèle plus
+# ancien, le pipeline est reconstruit à partir de ordinal_encoder.joblib et des
+# features du booster ; un modèle de prediction.py sans son pipeline est refusé.
+# Partagé par la page Prédiction de BI.py et par score.py.
+
+MODEL_PATH = "lgb_model.joblib"
+ENCODER_PATH = "ordinal_encoder.joblib"
+THRESHOLD = 0.5
+
+PROBA_COL = "Proba_fausse_commande"
+PREDICTION_COL = "Fausse_commande_predite"
+
+def load_artifacts(model_path=MODEL_PATH, pipeline_path=PIPELINE_PATH, encoder_path=ENCODER_PATH, mmap_mode=None):
+    model = joblib.load(model_path, mmap_mode=mmap_mode)
+    feature_names = getattr(model, "booster_", model).feature_name()
+    if os.path.exists(pipeline_path):
+        pipeline = load_pipeline(pipeline_path, mmap_mode=mmap_mode)
+    elif hasattr(model, "model_params"):
+        # Booster de prediction.py : l'encodeur historique ne correspond pas à son vocabulaire
+        raise FileNotFoundError(f"Pipeline de features {pipeline_path} introuvable pour le modèle {model_path}")
+    else:
+        encoder = joblib.load(encoder_path, mmap_mode=mmap_mode) if os.path.exists(encoder_path) else None
+        pipeline = FeaturePipeline.from_legacy(encoder, feature_names)
+    if list(pipeline.feature_names) != list(feature_names):
+        raise ValueError(f"Le pipeline {pipeline_path} ne correspond pas au modèle {model_path} (features différentes)")
+    return model, pipeline
+
+
+def model_proba(model, X, num_threads=0):
+    # Probabilité de fausse commande pour une matrice de features déjà transformée.
+    # num_threads : threads LightGBM (0 = défaut ; 1 dans les workers de score.py)
+    booster = getattr(model, "booster_", None)
+    if booster is None and not hasattr(model, "predict_proba"):
+        # lgb.Booster seul (modèles sauvegardés par prediction.py)
+        booster = model
+    if booster is not None:
+        # Booster directement (meilleure itération par défaut, comme predict_proba) :
+        # pas de validation DataFrame ni de contrôle des noms de colonnes du wrapper sklearn
+        return booster.predict(X, num_threads=num_threads) if num_threads else booster.predict(X)
+    # Tout autre modèle à l'interface scikit-learn
+    return model.predict_proba(X)[:, 1]
+
+
+def predict_proba(df, model, pipeline, velocity_store=None, num_threads=0):
+    return model_proba(model, pipeline.transform(df, velocity_store), num_threads)
+
+
+def score_frame(df, model, pipeline, threshold=THRESHOLD, velocity_store=None, num_threads=0):
+    # Copie de df avec la probabilité et la classe prédite ajoutées
+    proba = predict_proba(df, model, pipeline, velocity_store, num_threads)
+    out = df.copy()
+    out[PROBA_COL] = proba
+    out[PREDICTION_COL] = (proba >= threshold).astype(np.int8)
+    return out
@@ -0,0 +1,304 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import numpy as np
+import pandas as pd
+from features import normalize_columns
+from ingest import read_table
+from model_store import ModelStore
+from prediction import HISTORY_PATH, find_dataset
+from scoring import PREDICTION_COL, PROBA_COL, THRESHOLD, model_proba
+
+# =========================
+# Service HTTP de scoring (asyncio, bibliothèque standard)
+# =========================
+# Usage : python serve.py [--host 127.0.0.1] [--port 8765] [--max-batch 256] [--max-wait-ms 2] [--history FICHIER ...]
+#   POST /score        une commande (objet JSON)     -> {"Proba_fausse_commande": ..., "Fausse_commande_predite": ...}
+#   POST /score/batch  liste de commandes (JSON)     -> liste de résultats, dans le même ordre
+#   GET  /health       état du service et compteurs
+# Les commandes ont les colonnes du fichier à scorer (noms d'origine ou normalisés).
+# Le modèle reste chargé (ModelStore, rechargé si les fichiers changent) et les
+# requêtes concurrentes sont regroupées en un seul appel predict (micro-batching) :
+# le premier arrivé attend au plus max_wait_ms que d'autres le rejoignent.
+# Avec un modèle à vélocité, le store en ligne est amorcé au chargement avec les
+# commandes d'entraînement (classeur de prediction.py et historique incrémental).
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT_MS = 2.0
+# Identifiants inactifs retirés du store de vélocité au plus toutes les PRUNE_SECONDS
+PRUNE_SECONDS = 60
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def default_history():
+    # Commandes vues à l'entraînement : classeur par défaut de prediction.py + historique
+    return [p for p in (find_dataset(), HISTORY_PATH) if p is not None and os.path.exists(p)]
+
+
+def load_history_frames(paths):
+    # Colonnes normalisées avant concaténation (noms d'origine ou déjà normalisés)
+    frames = []
+    for path in paths:
+        df = read_table(path)
+        df.columns = normalize_columns(df.columns)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else None
+
+
+# =========================
+# Micro-batching
+# =========================
+class MicroBatcher:
+    def __init__(self, model_store, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 threshold=THRESHOLD, history=()):
+        self.model_store = model_store
+        self.history = history
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.threshold = threshold
+        self.queue = asyncio.Queue()
+        # Vélocité en ligne : les commandes sont vues dans leur ordre d'arrivée
+        self.velocity_store = None
+        self._pipeline = None
+        self._last_prune = 0.0
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+
+    async def score(self, orders):
+        # orders : liste de dicts ; résolu quand le lot qui les contient est scoré
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((orders, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            n_rows = len(pending[0][0])
+            deadline = loop.time() + self.max_wait
+            # Regroupe les requêtes arrivées pendant la fenêtre d'attente
+            while n_rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                n_rows += len(item[0])
+
+            if self.velocity_store is not None and loop.time() - self._last_prune > PRUNE_SECONDS:
+                # Sans élagage, le store garde tous les clients vus depuis le démarrage
+                self.velocity_store.prune()
+                self._last_prune = loop.time()
+
+            if len(pending) > 1:
+                try:
+                    await self._score_batch(loop, pending)
+                    continue
+                except Exception:
+                    # Une commande invalide fait échouer tout le lot : chaque requête est
+                    # rescorée seule, et seule celle en faute reçoit l'erreur
+                    pass
+            for item in pending:
+                try:
+                    await self._score_batch(loop, [item])
+                except Exception as e:
+                    if not item[1].done():
+                        item[1].set_exception(e)
+
+    async def _score_batch(self, loop, pending):
+        orders = [order for item, _ in pending for order in item]
+        # predict libère le GIL : le thread laisse la boucle accepter d'autres requêtes
+        proba = await loop.run_in_executor(None, self._predict, orders)
+
+        self.requests += len(pending)
+        self.batches += 1
+        self.rows += len(orders)
+        start = 0
+        for item, future in pending:
+            if not future.done():
+                future.set_result(proba[start:start + len(item)])
+            start += len(item)
+
+    def load_pipeline(self, pipeline):
+        # Nouveau pipeline (modèle rechargé) : store de vélocité reconstruit depuis
+        # l'historique, les commandes servies avec l'ancien modèle sont oubliées
+        if pipeline is self._pipeline:
+            return
+        history = load_history_frames(self.history) if pipeline.velocity else None
+        self.velocity_store = pipeline.velocity_store(history)
+        self._pipeline = pipeline
+        if history is not None:
+            print(f"🕒 Vélocité amorcée avec {len(history)} commandes ({len(self.velocity_store)} identifiants)")
+
+    def _predict(self, orders):
+        model, pipeline = self.model_store.get()
+        self.load_pipeline(pipeline)
+        X = pipeline.transform(pd.DataFrame.from_records(orders), self.velocity_store)
+        return model_proba(model, X)
+
+    def results(self, proba):
+        return [
+            {PROBA_COL: float(p), PREDICTION_COL: int(p >= self.threshold)}
+            for p in np.asarray(proba)
+        ]
+
+
+# =========================
+# HTTP/1.1 minimal (keep-alive, corps JSON)
+# =========================
+async def read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Ligne de requête invalide")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0) or 0)
+    body = await reader.readexactly(length) if length else b""
+    return method, path.split("?", 1)[0], headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+def parse_orders(body, batch):
+    try:
+        payload = json.loads(body or b"null")
+    except ValueError:
+        raise HttpError(400, "Corps JSON invalide")
+    if batch:
+        if not isinstance(payload, list) or not all(isinstance(o, dict) for o in payload):
+            raise HttpError(400, "Liste de commandes (objets JSON) attendue")
+        return payload
+    if not isinstance(payload, dict):
+        raise HttpError(400, "Commande (objet JSON) attendue")
+    return [payload]
+
+
+class ScoringServer:
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.started = time.time()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = await self.route(method, path, body)
+                except HttpError as e:
+                    status, payload, keep_alive = e.status, {"erreur": str(e)}, False
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    status, payload, keep_alive = 500, {"erreur": str(e)}, False
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        if path == "/health":
+            if method != "GET":
+                raise HttpError(405, "GET attendu")
+            b = self.batcher
+            return 200, {
+                "statut": "ok",
+                "modele_version": b.model_store.version,
+                "uptime_s": round(time.time() - self.started, 1),
+                "requetes": b.requests,
+                "lots": b.batches,
+                "commandes": b.rows,
+                "taille_moyenne_lot": round(b.rows / b.batches, 2) if b.batches else 0,
+            }
+        if path in ("/score", "/score/batch"):
+            if method != "POST":
+                raise HttpError(405, "POST attendu")
+            batch = path == "/score/batch"
+            orders = parse_orders(body, batch)
+            results = self.batcher.results(await self.batcher.score(orders)) if orders else []
+            return 200, results if batch else results[0]
+        raise HttpError(404, f"Chemin inconnu : {path}")
+
+
+async def serve(host, port, max_batch, max_wait_ms, threshold, history=()):
+    model_store = ModelStore()
+    batcher = MicroBatcher(model_store, max_batch, max_wait_ms, threshold, history)
+    # Chargement (et amorçage de la vélocité) avant la première requête
+    batcher.load_pipeline(model_store.get()[1])
+    server = ScoringServer(batcher)
+
+    batch_task = asyncio.create_task(batcher.run())
+    tcp = await asyncio.start_server(server.handle, host, port)
+    print(f"🚀 Service de scoring sur http://{host}:{port} (lots de {max_batch} max, attente {max_wait_ms} ms)")
+    try:
+        async with tcp:
+            await tcp.serve_forever()
+    finally:
+        batch_task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service HTTP de scoring des fausses commandes")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--history", nargs="*", default=None,
+                        help=f"Commandes passées rejouées dans le store de vélocité au chargement du modèle "
+                             f"(défaut : classeur d'entraînement et {HISTORY_PATH} ; --history seul : aucune)")
+    args = parser.parse_args()
+    history = default_history() if args.history is None else args.history
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch, args.max_wait_ms, args.threshold, history))
+    except KeyboardInterrupt:
+        print("\n👋 Arrêt du service")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from features import FeaturePipeline
+from velocity import DATE_COL, VelocityStore, velocity_features
+
+# =========================
+# Vélocité : calcul hors ligne (entraînement) == store en ligne (serve.py)
+# =========================
+
+
+def make_orders(n_rows=2000, n_customers=60, seed=0):
+    # Dates dans le désordre, doublons de date, identifiants et dates manquants
+    rng = np.random.default_rng(seed)
+    client = rng.integers(0, n_customers, n_rows)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 20 * 86400, n_rows), unit="s")
+    df = pd.DataFrame({
+        "@ Ip du client": [f"10.0.0.{c}" for c in client],
+        "date de creation": dates,
+        "nom prenom": [f"client {c % 40}" for c in client],
+        "numero de telephone": (500_000_000 + client).astype(float),
+        "Qte": rng.integers(1, 6, n_rows),
+        "Wilaya": rng.choice(["Alger", "Oran", "Blida"], n_rows),
+        "montant total": rng.uniform(1_000, 150_000, n_rows).round(2),
+    })
+    df.loc[df.sample(frac=0.05, random_state=1).index, "@ Ip du client"] = None
+    df.loc[df.sample(frac=0.05, random_state=2).index, "numero de telephone"] = np.nan
+    df.loc[df.sample(frac=0.02, random_state=3).index, "date de creation"] = pd.NaT
+    return df
+
+
+def normalized(df):
+    return df.rename(columns=lambda c: c.replace(" ", "_"))
+
+
+def test_store_matches_offline():
+    df = normalized(make_orders())
+    offline = velocity_features(df)
+
+    online = VelocityStore().update_frame(df)
+    pd.testing.assert_frame_equal(online, offline)
+
+    # Commande par commande, dans l'ordre chronologique
+    store = VelocityStore()
+    order = df[DATE_COL].sort_values(kind="stable").index
+    rows = {i: store.update(df.loc[i].to_dict()) for i in order}
+    one_by_one = pd.DataFrame.from_dict(rows, orient="index")[offline.columns].reindex(df.index)
+    pd.testing.assert_frame_equal(one_by_one, offline)
+    assert store.out_of_order == 0
+
+
+def test_seeded_store_matches_offline():
+    # Store amorcé avec l'historique puis alimenté par lots : mêmes valeurs que
+    # le calcul hors ligne sur historique + nouvelles commandes
+    df = normalized(make_orders())
+    df = df.sort_values(DATE_COL, kind="stable", na_position="first").reset_index(drop=True)
+    history, new = df.iloc[:1500], df.iloc[1500:]
+    expected = velocity_features(df).iloc[1500:]
+
+    store = VelocityStore()
+    store.update_frame(history)
+    online = pd.concat([store.update_frame(new.iloc[i:i + 50]) for i in range(0, len(new), 50)])
+    pd.testing.assert_frame_equal(online, expected)
+
+
+def test_pipeline_train_serve_parity():
+    df = make_orders()
+    pipeline = FeaturePipeline(velocity=True).fit(df)
+    train = pipeline.transform(df)
+
+    new = df.sort_values("date de creation", kind="stable")
+    served = pipeline.transform(new, pipeline.velocity_store())
+    np.testing.assert_array_equal(served, train[df.index.get_indexer(new.index)])
+
+    # Serveur amorcé avec une partie des commandes d'entraînement
+    ordered = df.sort_values("date de creation", kind="stable", na_position="first")
+    history, new = ordered.iloc[:1000], ordered.iloc[1000:]
+    served = pipeline.transform(new, pipeline.velocity_store(history))
+    np.testing.assert_array_equal(served, train[df.index.get_indexer(new.index)])
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import lightgbm as lgb
+
+# =========================
+# Recherche d'hyperparamètres (prediction.py --tune)
+# =========================
+# Essais tirés au hasard dans SEARCH_SPACE et entraînés en parallèle (threads :
+# LightGBM libère le GIL, num_threads réparti entre les essais), sur les mêmes
+# lgb.Dataset construits une seule fois (ou relus du cache, dataset_cache.py).
+# Élagage par la médiane : à chaque point de contrôle, un essai dont l'AUC de
+# validation est sous la médiane des essais précédents au même nombre d'arbres
+# est arrêté. Budget de temps global : plus
+# aucun essai ne démarre après l'échéance et ceux en cours s'arrêtent.
+# Chaque essai terminé est ajouté au journal (JSON lines) dès sa fin.
+
+TRIALS_LOG = "tuning_trials.jsonl"
+DEFAULT_TIME_BUDGET = 3600
+MAX_ROUNDS = 2000
+EARLY_STOPPING = 50
+PRUNE_EVERY = 25
+PRUNE_WARMUP = 50
+PRUNE_MIN_TRIALS = 4
+
+COMPLETE = "terminé"
+PRUNED = "élagué"
+TIMEOUT = "hors budget"
+
+# Paramètre -> (min, max, échelle) ; noms scikit-learn, acceptés aussi par lgb.train
+SEARCH_SPACE = {
+    "learning_rate": (0.01, 0.2, "log"),
+    "num_leaves": (15, 255, "int"),
+    "min_child_samples": (5, 100, "int"),
+    "colsample_bytree": (0.5, 1.0, "float"),
+    "subsample": (0.5, 1.0, "float"),
+    "reg_alpha": (1e-3, 10.0, "log"),
+    "reg_lambda": (1e-3, 10.0, "log"),
+}
+
+
+class TrialStopped(Exception):
+    def __init__(self, status, iteration, auc):
+        super().__init__(status)
+        self.status = status
+        self.iteration = iteration
+        self.auc = auc
+
+
+def sample_params(rng, space=SEARCH_SPACE):
+    params = {}
+    for name, (low, high, scale) in space.items():
+        if scale == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        elif scale == "int":
+            params[name] = int(rng.integers(low, high + 1))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    # subsample n'a d'effet qu'avec un bagging à chaque itération
+    params["subsample_freq"] = 1
+    return params
+
+
+def balanced_weights(y):
+    # Équivalent de class_weight="balanced" de LGBMClassifier
+    y = np.asarray(y).astype(int)
+    counts = np.bincount(y)
+    return (len(y) / (len(counts) * counts))[y]
+
+
+def booster_params(params):
+    # Paramètres LGBMClassifier -> lgb.train : class_weight remplacé par des poids
+    # (balanced_weights), nombre d'arbres passé à part ; AUC pour l'arrêt anticipé
+    # et l'élagage, logloss pour départager les AUC égales
+    params = {**params, "metric": ["auc", "binary_logloss"], "verbosity": -1}
+    for name in ("n_estimators", "n_jobs", "class_weight"):
+        params.pop(name, None)
+    return params
+
+
+class MedianPruner:
+    def __init__(self, every=PRUNE_EVERY, warmup=PRUNE_WARMUP, min_trials=PRUNE_MIN_TRIALS):
+        self.every = every
+        self.warmup = warmup
+        self.min_trials = min_trials
+        # Nombre d'arbres -> AUC de validation des essais passés par ce point de contrôle
+        self._history = {}
+        self._lock = threading.Lock()
+
+    def should_prune(self, iteration, auc):
+        if iteration < self.warmup or iteration % self.every:
+            return False
+        with self._lock:
+            seen = self._history.setdefault(iteration, [])
+            prune = len(seen) >= self.min_trials and auc < np.median(seen)
+            seen.append(auc)
+        return prune
+
+
+def _trial_callback(pruner, deadline):
+    def callback(env):
+        iteration = env.iteration + 1
+        auc = next(r[2] for r in env.evaluation_result_list if r[1] == "auc")
+        if time.time() > deadline:
+            raise TrialStopped(TIMEOUT, iteration, auc)
+        if pruner.should_prune(iteration, auc):
+            raise TrialStopped(PRUNED, iteration, auc)
+    callback.order = 40
+    return callback
+
+
+def run_trial(trial_id, params, base_params, train_set, valid_set, pruner, deadline, num_threads):
+    start = time.perf_counter()
+    train_params = {**booster_params({**base_params, **params}), "num_threads": num_threads}
+    record = {"essai": trial_id, "params": params}
+    try:
+        booster = lgb.train(
+            train_params, train_set, num_boost_round=MAX_ROUNDS, valid_sets=[valid_set],
+            callbacks=[lgb.early_stopping(EARLY_STOPPING, first_metric_only=True, verbose=False), _trial_callback(pruner, deadline)],
+        )
+        scores = booster.best_score["valid_0"]
+        record.update(statut=COMPLETE, n_arbres=booster.best_iteration,
+                      auc_val=scores["auc"], logloss_val=scores["binary_logloss"])
+    except TrialStopped as e:
+        record.update(statut=e.status, n_arbres=e.iteration, auc_val=e.auc)
+    record["secondes"] = round(time.perf_counter() - start, 2)
+    return record
+
+
+def tune(train_set, valid_set, base_params, time_budget=DEFAULT_TIME_BUDGET,
+         max_trials=None, parallel=None, seed=42, log_path=TRIALS_LOG):
+    # train_set / valid_set : Datasets construits (feature_pre_filter=False, entraînement
+    # pondéré par balanced_weights), partagés par tous les essais.
+    # Retourne (meilleur essai terminé ou None, essais, durée en secondes) ;
+    # les paramètres de l'essai complètent base_params
+    cores = os.cpu_count() or 1
+    parallel = parallel or min(4, cores)
+    num_threads = max(1, cores // parallel)
+    deadline = time.time() + time_budget
+    rng = np.random.default_rng(seed)
+    pruner = MedianPruner()
+
+    trials = []
+    start = time.time()
+    open(log_path, "w").close()
+    with ThreadPoolExecutor(parallel) as pool:
+        running = set()
+        trial_id = 0
+        while True:
+            # Un nouvel essai dès qu'un thread se libère, tant que le budget le permet
+            while len(running) < parallel and time.time() < deadline and (max_trials is None or trial_id < max_trials):
+                running.add(pool.submit(run_trial, trial_id, sample_params(rng), base_params,
+                                        train_set, valid_set, pruner, deadline, num_threads))
+                trial_id += 1
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = future.result()
+                trials.append(record)
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                print(f"   essai {record['essai']:>3} : {record['statut']:<11} AUC val {record['auc_val']:.4f}"
+                      f" ({record['n_arbres']} arbres, {record['secondes']:.1f}s)")
+
+    elapsed = time.time() - start
+    complete = [t for t in trials if t["statut"] == COMPLETE]
+    if not complete:
+        return None, trials, elapsed
+    best = max(complete, key=lambda t: (t["auc_val"], -t["logloss_val"]))
+    return best, trials, elapsed
+
@@ -0,0 +1,225 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+# =========================
+# Features de vélocité par client (fenêtres glissantes)
+# =========================
+# Pour chaque commande et chaque identifiant (IP, téléphone, nom) : nombre de
+# commandes, montant total et quantité du même identifiant sur la dernière
+# heure / journée / semaine, commande courante comprise (]t - fenêtre, t]).
+#   - hors ligne (entraînement, fichiers) : velocity_features(), vectorisé
+#     (tri unique par (identifiant, date), searchsorted + sommes cumulées) ;
+#   - en ligne (scoring commande par commande) : VelocityStore.update(), O(1)
+#     amorti par commande (une file par identifiant et par fenêtre).
+# Dates tronquées à la seconde et montants cumulés en centimes entiers : les
+# deux chemins donnent exactement les mêmes valeurs, à condition que le flux en
+# ligne arrive dans l'ordre chronologique.
+
+DATE_COL = "date_de_creation"
+AMOUNT_COL = "montant_total"
+QTY_COL = "Qte"
+
+# Identifiant -> préfixe des features
+KEYS = {
+    "@_Ip_du_client": "ip",
+    "numero_de_telephone": "tel",
+    "nom_prenom": "nom",
+}
+
+# Fenêtre -> durée en secondes
+WINDOWS = {
+    "1h": 3600,
+    "1j": 86400,
+    "7j": 7 * 86400,
+}
+
+
+def feature_names(keys=KEYS, windows=WINDOWS):
+    return [
+        f"{prefix}_{stat}_{window}"
+        for prefix in keys.values()
+        for window in windows
+        for stat in ("nb", "montant", "qte")
+    ]
+
+
+def _seconds(values):
+    return pd.to_datetime(values, errors="coerce")
+
+
+def _epoch_seconds(value):
+    # Date scalaire -> secondes entières depuis 1970 (None si absente ou invalide)
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    if ts is pd.NaT:
+        return None
+    return ts.value // 1_000_000_000
+
+
+def _cents(values):
+    return np.round(pd.to_numeric(values, errors="coerce").fillna(0).to_numpy(np.float64) * 100).astype(np.int64)
+
+
+def velocity_features(df, keys=KEYS, windows=WINDOWS, date_col=DATE_COL):
+    # df : colonnes normalisées (date_de_creation, montant_total, Qte, identifiants).
+    # Retourne un DataFrame float64 aligné sur df ; NaN si identifiant ou date manquant.
+    n = len(df)
+    names = feature_names(keys, windows)
+    values = np.full((n, len(names)), np.nan)
+    if n == 0 or date_col not in df.columns:
+        return pd.DataFrame(values, index=df.index, columns=names)
+
+    dates = _seconds(df[date_col])
+    valid_date = dates.notna().to_numpy()
+    ts = np.where(valid_date, dates.to_numpy("datetime64[s]").astype(np.int64), 0)
+    ts = ts - ts[valid_date].min() if valid_date.any() else ts
+    cents = _cents(df[AMOUNT_COL]) if AMOUNT_COL in df.columns else np.zeros(n, np.int64)
+    qty = pd.to_numeric(df[QTY_COL], errors="coerce").fillna(0).to_numpy(np.int64) if QTY_COL in df.columns else np.zeros(n, np.int64)
+
+    max_window = max(windows.values())
+    for key, prefix in keys.items():
+        if key not in df.columns:
+            continue
+        codes, _ = pd.factorize(df[key], use_na_sentinel=True)
+        valid = (codes >= 0) & valid_date
+
+        # Clé composite : identifiant * M + date (décalée de la plus grande fenêtre).
+        # Un seul tri stable par (identifiant, date, position) : chaque groupe est
+        # contigu et chronologique.
+        span = int(ts.max()) + max_window + 1
+        composite = codes.astype(np.int64) * span + (ts + max_window)
+        order = np.flatnonzero(valid)
+        order = order[np.argsort(composite[order], kind="stable")]
+        composite = composite[order]
+        g = codes[order].astype(np.int64)
+        t = ts[order]
+        cs_n = np.arange(len(order) + 1)
+        cs_amount = np.concatenate(([0], np.cumsum(cents[order])))
+        cs_qty = np.concatenate(([0], np.cumsum(qty[order])))
+        right = np.arange(1, len(order) + 1)
+
+        for window, seconds in windows.items():
+            # Première commande du même identifiant avec date > t - fenêtre
+            left = composite.searchsorted(g * span + (t - seconds + 1 + max_window), side="left")
+            j = names.index(f"{prefix}_nb_{window}")
+            values[order, j] = cs_n[right] - cs_n[left]
+            values[order, j + 1] = (cs_amount[right] - cs_amount[left]) / 100
+            values[order, j + 2] = cs_qty[right] - cs_qty[left]
+    return pd.DataFrame(values, index=df.index, columns=names)
+
+
+# =========================
+# Store en ligne (une commande à la fois)
+# =========================
+class _Window:
+    __slots__ = ("events", "count", "cents", "qty")
+
+    def __init__(self):
+        self.events = deque()
+        self.count = 0
+        self.cents = 0
+        self.qty = 0
+
+
+class VelocityStore:
+    def __init__(self, keys=KEYS, windows=WINDOWS, date_col=DATE_COL):
+        self.keys = keys
+        self.windows = windows
+        self.date_col = date_col
+        self.feature_names = feature_names(keys, windows)
+        # (identifiant, fenêtre) -> noms des trois features, calculés une seule fois
+        self._names = {
+            (prefix, window): (f"{prefix}_nb_{window}", f"{prefix}_montant_{window}", f"{prefix}_qte_{window}")
+            for prefix in keys.values() for window in windows
+        }
+        self._state = {}
+        # Commandes reçues avec une date antérieure à la précédente : leurs
+        # features (et les suivantes) peuvent différer du calcul hors ligne
+        self.last_ts = None
+        self.out_of_order = 0
+
+    def update(self, order):
+        # order : dict aux colonnes normalisées. Ajoute la commande et retourne ses features.
+        return self._push(self._parse(order))
+
+    def _parse(self, order):
+        # Valeurs lues et vérifiées sans toucher au store : une commande invalide
+        # lève ici, avant que l'historique ne soit modifié
+        ts = _epoch_seconds(order.get(self.date_col))
+        if ts is None:
+            return None
+        amount = order.get(AMOUNT_COL)
+        cents = 0 if amount is None or pd.isna(amount) else int(round(float(amount) * 100))
+        qty = order.get(QTY_COL)
+        qty = 0 if qty is None or pd.isna(qty) else int(qty)
+        ids = []
+        for key, prefix in self.keys.items():
+            value = order.get(key)
+            if value is None or pd.isna(value):
+                continue
+            hash(value)
+            ids.append((key, prefix, value))
+        return ts, cents, qty, ids
+
+    def _push(self, parsed):
+        features = dict.fromkeys(self.feature_names, np.nan)
+        if parsed is None:
+            return features
+        ts, cents, qty, ids = parsed
+        if self.last_ts is not None and ts < self.last_ts:
+            self.out_of_order += 1
+        else:
+            self.last_ts = ts
+
+        for key, prefix, value in ids:
+            state = self._state.get((key, value))
+            if state is None:
+                state = self._state[key, value] = {w: _Window() for w in self.windows}
+            for window, seconds in self.windows.items():
+                w = state[window]
+                w.events.append((ts, cents, qty))
+                w.count += 1
+                w.cents += cents
+                w.qty += qty
+                # Expiration des commandes sorties de la fenêtre ]ts - durée, ts]
+                while w.events[0][0] <= ts - seconds:
+                    _, old_cents, old_qty = w.events.popleft()
+                    w.count -= 1
+                    w.cents -= old_cents
+                    w.qty -= old_qty
+                nb, montant, qte = self._names[prefix, window]
+                features[nb] = float(w.count)
+                features[montant] = w.cents / 100
+                features[qte] = float(w.qty)
+        return features
+
+    def update_frame(self, df):
+        # Rejoue un DataFrame (colonnes normalisées) dans l'ordre chronologique.
+        # Tout le lot est vérifié avant la première mise à jour : en cas d'erreur,
+        # le store reste inchangé (un lot rejoué ne compte pas deux fois ses commandes)
+        dates = _seconds(df[self.date_col])
+        order = np.argsort(dates.to_numpy(), kind="stable")
+        parsed = [self._parse(r) for r in df.iloc[order].to_dict("records")]
+        rows = [self._push(p) for p in parsed]
+        return pd.DataFrame(rows, index=df.index[order], columns=self.feature_names).reindex(df.index)
+
+    def prune(self, now=None):
+        # Supprime les identifiants sans commande dans la plus grande fenêtre ;
+        # now : date de référence (défaut : date de la dernière commande reçue)
+        max_window = max(self.windows.values())
+        ts = self.last_ts if now is None else _epoch_seconds(now)
+        if ts is None:
+            return 0
+        stale = [
+            k for k, state in self._state.items()
+            if all(not w.events or w.events[-1][0] <= ts - max_window for w in state.values())
+        ]
+        for k in stale:
+            del self._state[k]
+        return len(stale)
+
+    def __len__(self):
+        return len(self._state)